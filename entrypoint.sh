@@ -45,4 +45,17 @@ END
 echo "Starting Gunicorn..."
 # We use the MANAGE_DIR to tell Gunicorn where to look for the 'config' folder
 cd "$MANAGE_DIR"
-exec gunicorn config.wsgi:application --bind 0.0.0.0:8000
+# Gunicorn also reads WEB_CONCURRENCY itself and fails on an empty value, so
+# always export a number (docker compose passes it through, possibly empty)
+if [ -z "$WEB_CONCURRENCY" ]; then
+    WEB_CONCURRENCY=$((2 * $(nproc) + 1))
+fi
+export WEB_CONCURRENCY
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn config.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers "$WEB_CONCURRENCY" \
+        --bind 0.0.0.0:8000
+fi
+exec gunicorn config.wsgi:application --workers "$WEB_CONCURRENCY" --bind 0.0.0.0:8000
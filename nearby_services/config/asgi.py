@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Worker processes import this module after forking, so each one builds its
+# own nearby index here (NEARBY_BACKEND = "memory" only)
+from users.spatial_index import warm_service_index  # noqa: E402
+
+warm_service_index()
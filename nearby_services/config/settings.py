@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'users',
     'rest_framework',
     'django.contrib.gis',
+    'django.contrib.postgres',
 
 ]
 
@@ -64,6 +65,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'users.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -85,6 +87,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# "wsgi" (gunicorn sync workers) or "asgi" (gunicorn + uvicorn workers).
+# Under ASGI the service read endpoints use the async views.
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+ASYNC_READ_VIEWS = SERVER_MODE == "asgi"
 
 
 
@@ -105,6 +113,20 @@ DATABASES = {
     )
 }
 
+# Read replicas, comma-separated database URLs (see users/db_router.py)
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dj_database_url.parse(
+        replica_url.strip(),
+        engine="django.contrib.gis.db.backends.postgis"
+    )
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["users.db_router.PrimaryReplicaRouter"]
+READ_YOUR_WRITES_SECONDS = 5   # reads stay on the primary this long after a user writes
+
 
 # DATABASES = {
 #     'default': {
@@ -216,6 +238,58 @@ CACHES = {
     }
 }
 CACHE_TTL = 60 * 5  # 5 minutes
-
-
-
+# Stampede protection for cache fills (see users/cache_fill.py)
+CACHE_TTL_JITTER = 0.1          # +/- 10% on every TTL
+CACHE_STALE_TTL = 60            # seconds an expired entry may be served while one request refreshes it
+CACHE_EARLY_EXPIRY_BETA = 1.0   # >1 refreshes earlier, <1 later
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2.0           # seconds a request with nothing to serve waits for the refresh
+NEGATIVE_CACHE_TTL = 60         # empty results and "not found"
+SERVICE_READ_MAX_AGE = 15       # Cache-Control max-age on service reads; clients revalidate with ETags
+
+# Authentication cache: per-process LRU in front of Redis
+AUTH_TOKEN_CACHE_TTL = 60 * 5
+AUTH_USER_CACHE_TTL = 60 * 5
+AUTH_LOCAL_CACHE_TTL = 30   # bounds how long other workers see a stale role/status
+AUTH_LOCAL_CACHE_SIZE = 10000
+
+# Activity log write-behind (see users/audit.py)
+ACTIVITY_LOG_FLUSH_SIZE = 100       # queued entries that trigger a flush
+ACTIVITY_LOG_FLUSH_INTERVAL = 2.0   # seconds between background flushes
+ACTIVITY_LOG_BATCH_SIZE = 1000
+ACTIVITY_LOG_PAGE_SIZE = 100
+ACTIVITY_LOG_MAX_PAGE_SIZE = 1000
+# Range partitions on timestamp (see users/partitions.py)
+ACTIVITY_LOG_PARTITION_MONTHS = 1
+ACTIVITY_LOG_PARTITIONS_AHEAD = 3     # months of partitions created in advance
+ACTIVITY_LOG_RETENTION_MONTHS = 12
+
+# Service list (keyset pagination)
+SERVICE_LIST_PAGE_SIZE = 100
+SERVICE_LIST_MAX_PAGE_SIZE = 1000
+SERVICE_EXPORT_CHUNK_SIZE = 2000
+SERVICE_IMPORT_BATCH_SIZE = 1000
+SERVICE_IMPORT_MAX_ERRORS = 50
+
+# Nearby search
+NEARBY_DEFAULT_RADIUS_KM = 5
+NEARBY_MAX_LIMIT = 100
+NEARBY_BATCH_MAX_QUERIES = 100
+# sort=relevance ranks by rating x exp(-distance / NEARBY_RELEVANCE_DECAY_KM)
+NEARBY_RELEVANCE_DECAY_KM = 2.0
+NEARBY_RELEVANCE_DEFAULT_LIMIT = 20
+NEARBY_QUERY_MAX_LENGTH = 64   # longest `q` name search
+METADATA_FILTER_MAX_LENGTH = 1024   # longest `metadata` containment filter (JSON)
+# "database" (PostGIS + Redis cache) or "memory" (in-process index, needs numpy)
+NEARBY_BACKEND = os.environ.get("NEARBY_BACKEND", "database")
+SERVICE_INDEX_SYNC_INTERVAL = 1.0   # seconds between change feed checks
+SERVICE_INDEX_MAX_CHANGES = 1000    # larger change sets trigger a rebuild
+SERVICE_INDEX_CHANGE_TTL = 60 * 60
+NEARBY_VERSION_TTL = 60 * 60 * 24  # cell/tile version tokens outlive cached entries
+NEARBY_CELL_MAX_CANDIDATES = 5000  # denser cells are not cached; searches in them query PostGIS
+
+# Map tiles
+TILE_MAX_ZOOM = 16
+TILE_CACHE_TTL = 60 * 60
+CLUSTER_GRID_PER_TILE = 8   # clusters are an 8 x 8 grid per tile
+CLUSTER_MAX_TILES = 64
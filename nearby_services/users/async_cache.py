@@ -0,0 +1,66 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Non-blocking access to the default Redis cache for async views.
+#
+# Django's cache.aget() and friends run the sync client in a thread. This goes
+# through redis.asyncio instead, using django-redis' own key format and
+# serializer, so entries are shared with the sync views both ways.
+
+import asyncio
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from redis import asyncio as aioredis
+
+
+class AsyncCache:
+    def __init__(self, url):
+        self._url = url
+        # A connection pool can only be used from the event loop it was made in
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = aioredis.Redis.from_url(self._url)
+        return client
+
+    async def get(self, key, default=None):
+        value = await self._client().get(cache.make_key(key))
+        return default if value is None else cache.client.decode(value)
+
+    async def get_many(self, keys):
+        keys = list(keys)
+        values = await self._client().mget([cache.make_key(key) for key in keys])
+        return {
+            key: cache.client.decode(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    async def set(self, key, value, timeout):
+        await self._client().set(cache.make_key(key), cache.client.encode(value), ex=timeout)
+
+    async def add(self, key, value, timeout):
+        added = await self._client().set(
+            cache.make_key(key), cache.client.encode(value), ex=timeout, nx=True
+        )
+        return bool(added)
+
+    # Unprefixed, unserialized access for values stored as raw bytes
+
+    async def raw_get(self, redis_key):
+        return await self._client().get(redis_key)
+
+    async def raw_set(self, redis_key, value, timeout, nx=False):
+        return bool(await self._client().set(redis_key, value, ex=timeout, nx=nx))
+
+    async def raw_eval(self, script, keys, args):
+        return await self._client().eval(script, len(keys), *keys, *args)
+
+
+async_cache = AsyncCache(settings.REDIS_URL)
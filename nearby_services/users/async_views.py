@@ -0,0 +1,254 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Async versions of the service read endpoints, used instead of the APIView
+# ones when the app runs under ASGI (SERVER_MODE=asgi). Redis is reached
+# through redis.asyncio, so a worker keeps serving other requests while one
+# waits on the cache. Django 4.2's async ORM still runs every query on the
+# worker's one thread-sensitive thread, so database work is not concurrent
+# within a worker. Responses match the sync views.
+
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .cache_fill import acached_bytes
+from .caching import (
+    NearbyCell, acell_version, is_oversized, nearby_etag, pack_candidates, select_candidates,
+    service_detail_key
+)
+from .db_router import CACHE_FILL_DB
+from .models import Service
+from .pagination import akeyset_page, parse_page_size
+from .rendering import (
+    detail_entry, envelope_bytes, etag_json_response, etag_matches, gzip_json, gzip_json_response,
+    json_response, not_modified, render_json, service_detail_payload, service_etag,
+    split_detail_entry, with_validators
+)
+from .search import (
+    candidate_queryset, direct_queryset, direct_results, filter_metadata, parse_metadata_filter,
+    parse_nearby_query, uses_cell_cache, uses_memory_index
+)
+from .serializers import service_rows
+from .spatial_index import get_service_index
+
+
+def _response(data, status=200):
+    # Same compact, non-ASCII-escaped output as DRF's JSONRenderer
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")}
+    )
+
+
+def _authenticate(request):
+    try:
+        return CachedJWTAuthentication().authenticate(request)
+    finally:
+        # Runs on a pool thread that never sees request_finished, so close a
+        # connection opened on a user cache miss here
+        close_old_connections()
+
+
+class AsyncAPIView(View):
+    """
+    Async stand-in for DRF's APIView on authenticated read endpoints: runs
+    CachedJWTAuthentication and the default throttles, then the handler.
+    Both are blocking Redis calls, run on the default thread pool rather than
+    the worker's single thread-sensitive thread so requests do not queue on
+    each other there.
+    """
+    http_method_names = ["get", "head", "options"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user_auth = await sync_to_async(_authenticate, thread_sensitive=False)(request)
+        except AuthenticationFailed as e:
+            return self._unauthorized(e.detail)
+
+        if user_auth is None:
+            return self._unauthorized("Authentication credentials were not provided.")
+
+        request.user, request.auth = user_auth
+
+        for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+            throttle = throttle_class()
+            if not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, self):
+                wait = math.ceil(throttle.wait() or 0)
+                response = _response(
+                    {"detail": f"Request was throttled. Expected available in {wait} seconds."},
+                    status=429
+                )
+                response["Retry-After"] = str(wait)
+                return response
+
+        return await super().dispatch(request, *args, **kwargs)
+
+    def _unauthorized(self, detail):
+        response = _response({"detail": detail}, status=401)
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+
+# -----------------------------
+# 📋 LIST ALL SERVICES (Async)
+# -----------------------------
+class AsyncServiceListView(AsyncAPIView):
+
+    async def get(self, request):
+        try:
+            try:
+                page_size = parse_page_size(
+                    request.GET.get("page_size"),
+                    settings.SERVICE_LIST_PAGE_SIZE,
+                    settings.SERVICE_LIST_MAX_PAGE_SIZE
+                )
+                metadata = parse_metadata_filter(request.GET.get("metadata"))
+                services = filter_metadata(Service.objects.all(), metadata)
+                services, next_cursor = await akeyset_page(
+                    service_rows(services), ["id"], request.GET.get("cursor"), page_size
+                )
+            except ValueError as e:
+                return _response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": str(e),
+                    "data": ""
+                }, status=400)
+
+            return etag_json_response(request, render_json({
+                "status": "success",
+                "error_code": 0,
+                "message": "Service list fetched successfully",
+                "data": services,
+                "next_cursor": next_cursor
+            }))
+
+        except Exception as e:
+            return _response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=500)
+
+
+# -----------------------------
+# 📄 SERVICE DETAIL (Async, Cached)
+# -----------------------------
+class AsyncServiceDetailView(AsyncAPIView):
+
+    async def get(self, request, pk=None):
+        try:
+            fetched = []
+
+            async def fill():
+                service = await service_rows(Service.objects.using(CACHE_FILL_DB).filter(id=pk), "updated_at").afirst()
+                etag = service_etag(service["id"], service.pop("updated_at")) if service else None
+                fetched.append((service, etag))
+                body = gzip_json(service_detail_payload(service, cached=True))
+                return detail_entry(etag, body), service is None
+
+            entry, cached = await acached_bytes(service_detail_key(pk), fill, settings.CACHE_TTL)
+
+            if cached:
+                etag, body = split_detail_entry(entry)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+                return gzip_json_response(request, body, etag)
+
+            service, etag = fetched[0]
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return with_validators(_response(service_detail_payload(service, cached=False)), etag)
+
+        except Exception as e:
+            return _response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=500)
+
+
+# -----------------------------
+# 📍 NEARBY SEARCH (Async, Cached GIS Query)
+# -----------------------------
+class AsyncNearbyServiceView(AsyncAPIView):
+
+    async def get(self, request):
+        try:
+            try:
+                query = parse_nearby_query(request.GET)
+            except ValueError as e:
+                return _response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": str(e),
+                    "data": ""
+                }, status=400)
+
+            lat, lng = query["lat"], query["lng"]
+            radius, limit = query["radius"], query["limit"]
+            category = query["category"]
+
+            if uses_memory_index(query):
+                results = await sync_to_async(get_service_index().search)(
+                    lat, lng, radius, category, limit, query["min_rating"], query["sort"]
+                )
+                return etag_json_response(request, render_json({
+                    "status": "success",
+                    "error_code": 0,
+                    "message": "Nearby services fetched successfully",
+                    "data": results
+                }))
+
+            cell = NearbyCell.for_search(lat, lng, radius) if uses_cell_cache(query) else None
+            etag = None
+
+            if cell is not None:
+                cache_key = cell.cache_key(category, await acell_version(cell), query["q"], query["metadata"])
+
+                etag = nearby_etag(cache_key, query)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+
+                async def fill():
+                    rows = [row async for row in candidate_queryset(cell, query)]
+                    return pack_candidates(rows), not rows
+
+                candidates, cached = await acached_bytes(cache_key, fill, settings.CACHE_TTL)
+
+                if not is_oversized(candidates):
+                    return with_validators(json_response(envelope_bytes(
+                        "Nearby services fetched successfully (cached)" if cached
+                        else "Nearby services fetched successfully",
+                        select_candidates(candidates, lat, lng, radius, limit, query["min_rating"])
+                    )), etag)
+
+            rows = [row async for row in direct_queryset(query)]
+
+            return etag_json_response(request, render_json({
+                "status": "success",
+                "error_code": 0,
+                "message": "Nearby services fetched successfully",
+                "data": direct_results(rows, query)
+            }), etag)
+
+        except Exception as e:
+            return _response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=500)
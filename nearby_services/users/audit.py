@@ -0,0 +1,234 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Write-behind ActivityLog pipeline.
+# record_activity() only appends a JSON entry to a Redis list; a background
+# thread in each worker moves entries into the table with bulk_create once
+# ACTIVITY_LOG_FLUSH_SIZE entries are queued or every
+# ACTIVITY_LOG_FLUSH_INTERVAL seconds, and once more when the process exits.
+# Entries are trimmed from the list only after they are inserted, and only
+# by the flusher still holding the flush lock, so a crash, a database outage
+# or an overlapping flush can repeat an entry but never loses one. Entries
+# the database rejects for good (IntegrityError) are dropped. If Redis is
+# unreachable the entry is written synchronously instead.
+#
+# Also builds the filtered queryset behind the activity log API, which is
+# paged by keyset on ACTIVITY_LOG_ORDERING (see the ActivityLog indexes).
+
+import atexit
+import json
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache_fill import RELEASE_LOCK_SCRIPT
+from .export import parse_timestamp
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "activity_log:queue"
+FLUSH_LOCK_KEY = "activity_log:flush_lock"
+
+# Trims a flushed batch of ARGV[2] entries off the queue (KEYS[2]) and extends
+# the lock (KEYS[1]) by ARGV[3] seconds, only while the lock still holds this
+# flusher's token (ARGV[1]). Returns 0 if the lock was lost.
+TRIM_BATCH_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('LTRIM', KEYS[2], tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+
+ACTIVITY_LOG_ORDERING = ["-timestamp", "-id"]
+ACTIVITY_LOG_ACTIONS = [action for action, _ in ActivityLog.ACTION_CHOICES]
+
+
+def _redis():
+    """Raw client for the default cache, or None when it is not django-redis."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def _log_entry(entry):
+    return ActivityLog(
+        performed_by_id=entry["performed_by_id"],
+        target_user_id=entry["target_user_id"],
+        action=entry["action"],
+        details=entry["details"],
+        timestamp=parse_datetime(entry["timestamp"]),
+    )
+
+
+def record_activity(performed_by, action, target_user=None, details=None):
+    entry = {
+        "performed_by_id": performed_by.pk,
+        "target_user_id": target_user.pk if target_user else None,
+        "action": action,
+        "details": details,
+        "timestamp": timezone.now().isoformat(),
+    }
+
+    client = _redis()
+    try:
+        if client is None:
+            raise ConnectionError("cache backend has no Redis client")
+        queued = client.rpush(cache.make_key(QUEUE_KEY), json.dumps(entry))
+    except Exception:
+        # Durable fallback: never drop an audit entry
+        _log_entry(entry).save()
+        return
+
+    _flusher.start()
+    if queued >= settings.ACTIVITY_LOG_FLUSH_SIZE:
+        _flusher.wake()
+
+
+def _insert(entries):
+    """
+    Insert a batch. Connection errors (OperationalError, InterfaceError)
+    propagate, so the entries stay queued for the next flush.
+    """
+    try:
+        with transaction.atomic():
+            ActivityLog.objects.bulk_create(entries)
+    except IntegrityError:
+        # One bad entry (e.g. a user deleted meanwhile) must not block the
+        # queue; insert the rest one by one and drop what can never be stored
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    entry.save()
+            except IntegrityError:
+                logger.exception("Dropping activity log entry %s", entry.action)
+
+
+def flush_activity_log():
+    """Insert every queued entry; returns how many were flushed."""
+    client = _redis()
+    if client is None:
+        return 0
+
+    # One flusher at a time, or two workers would insert the same entries
+    # and each trim a batch off the queue
+    lock_key = cache.make_key(FLUSH_LOCK_KEY)
+    lock_timeout = max(60, int(settings.ACTIVITY_LOG_FLUSH_INTERVAL * 10))
+    token = uuid.uuid4().hex
+    if not client.set(lock_key, token, nx=True, ex=lock_timeout):
+        return 0
+
+    key = cache.make_key(QUEUE_KEY)
+    batch_size = settings.ACTIVITY_LOG_BATCH_SIZE
+    trim_batch = client.register_script(TRIM_BATCH_SCRIPT)
+    flushed = 0
+
+    try:
+        while True:
+            raw_entries = client.lrange(key, 0, batch_size - 1)
+            if not raw_entries:
+                break
+
+            _insert([_log_entry(json.loads(raw)) for raw in raw_entries])
+            if not trim_batch(keys=[lock_key, key], args=[token, len(raw_entries), lock_timeout]):
+                # The lock expired during the insert and another flusher may
+                # be draining the same entries; leave the queue to it
+                logger.warning("Activity log flush lock lost, stopping after %d entries", flushed)
+                break
+            flushed += len(raw_entries)
+    finally:
+        client.register_script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[token])
+
+    return flushed
+
+
+class _Flusher:
+    """Per-process background thread draining the queue."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="activity-log-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.ACTIVITY_LOG_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                flush_activity_log()
+            except Exception:
+                logger.exception("Activity log flush failed")
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        try:
+            flush_activity_log()
+        except Exception:
+            logger.exception("Activity log flush on shutdown failed")
+
+
+_flusher = _Flusher()
+
+
+def _user_id(value, name):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}, expected a user id")
+
+
+def activity_log_queryset(params):
+    """
+    ActivityLog rows matching the `action`, `performed_by`, `target_user`,
+    `since` (inclusive) and `until` (exclusive) query params.
+    Raises ValueError for invalid params.
+    """
+    action = params.get("action")
+    if action and action not in ACTIVITY_LOG_ACTIONS:
+        raise ValueError(f"Invalid action, expected one of {', '.join(ACTIVITY_LOG_ACTIONS)}")
+
+    performed_by = _user_id(params.get("performed_by"), "performed_by")
+    target_user = _user_id(params.get("target_user"), "target_user")
+    since = parse_timestamp(params.get("since"), "since")
+    until = parse_timestamp(params.get("until"), "until")
+
+    logs = ActivityLog.objects.all()
+    if action:
+        logs = logs.filter(action=action)
+    if performed_by is not None:
+        logs = logs.filter(performed_by_id=performed_by)
+    if target_user is not None:
+        logs = logs.filter(target_user_id=target_user)
+    if since:
+        logs = logs.filter(timestamp__gte=since)
+    if until:
+        logs = logs.filter(timestamp__lt=until)
+
+    return logs.select_related("performed_by", "target_user")
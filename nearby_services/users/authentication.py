@@ -1,27 +1,138 @@
 __author__ = "Megha Shinde"
 __date__ = "16-02-2026"
 __lastupdatedby__ = "Megha Shinde"
-__lastupdateddate__ = "18-02-2026"
+__lastupdateddate__ = "18-10-2026"
 # users/authentication.py
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.conf import settings
 from django.core.cache import cache
 from rest_framework.exceptions import AuthenticationFailed
 
+from .db_router import pin_recent_writer
+
+
+class LocalTTLCache:
+    """Small thread-safe LRU with per-entry expiry, private to this process."""
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Tier 1: per process, no round trip. Kept short-lived because other
+# processes cannot evict it; tier 2 (Redis) is shared and explicitly evicted.
+_local_tokens = LocalTTLCache(settings.AUTH_LOCAL_CACHE_SIZE)
+_local_users = LocalTTLCache(settings.AUTH_LOCAL_CACHE_SIZE)
+
+
+def _user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def _token_ttl(validated_token, ttl):
+    # Never cache a token past its own expiry
+    expires_in = int(validated_token.get("exp", 0) - time.time())
+    return min(ttl, expires_in)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop a user's cached record after a role or status change. Other
+    processes pick the change up within AUTH_LOCAL_CACHE_TTL.
+    """
+    _local_users.delete(str(user_id))
+    cache.delete(_user_cache_key(user_id))
+
+
 class CachedJWTAuthentication(JWTAuthentication):
 
+    def authenticate(self, request):
+        user_auth = super().authenticate(request)
+        if user_auth is not None:
+            # Read-your-writes: users who just wrote read from the primary
+            pin_recent_writer(request, user_auth[0])
+        return user_auth
+
     def get_validated_token(self, raw_token):
-        cache_key = f"auth_token:{raw_token}"
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        token_hash = hashlib.sha256(raw_token).hexdigest()
 
-        # Check Redis first
-        validated_token = cache.get(cache_key)
-        if validated_token:
+        validated_token = _local_tokens.get(token_hash)
+        if validated_token is not None:
             return validated_token
 
-        # If not cached → validate normally
-        validated_token = super().get_validated_token(raw_token)
+        # Check Redis next
+        cache_key = f"auth_token:{token_hash}"
+        validated_token = cache.get(cache_key)
+
+        if validated_token is None:
+            # If not cached → validate normally
+            validated_token = super().get_validated_token(raw_token)
+
+            ttl = _token_ttl(validated_token, settings.AUTH_TOKEN_CACHE_TTL)
+            if ttl > 0:
+                cache.set(cache_key, validated_token, timeout=ttl)
 
-        # Store in Redis (short TTL)
-        cache.set(cache_key, validated_token, timeout=300)
+        ttl = _token_ttl(validated_token, settings.AUTH_LOCAL_CACHE_TTL)
+        if ttl > 0:
+            _local_tokens.set(token_hash, validated_token, ttl)
 
         return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[jwt_settings.USER_ID_CLAIM])
+        except KeyError:
+            # Let simplejwt raise its usual InvalidToken
+            return super().get_user(validated_token)
+
+        user = _local_users.get(user_id)
+
+        if user is None:
+            user = cache.get(_user_cache_key(user_id))
+
+            if user is None:
+                # Hits the database and rejects missing or inactive users
+                user = super().get_user(validated_token)
+                cache.set(_user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TTL)
+
+            _local_users.set(user_id, user, settings.AUTH_LOCAL_CACHE_TTL)
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        return user
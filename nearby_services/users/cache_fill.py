@@ -0,0 +1,158 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Stampede-safe cache fills for the detail and nearby caches.
+#
+# Values are raw bytes written through the Redis client, so a hit is a GET
+# with no unpickling. Each entry is a small header, (expires, delta), followed
+# by the payload: `expires` is a soft expiry (jittered by CACHE_TTL_JITTER so
+# entries filled together do not expire together) and `delta` is how long the
+# payload took to compute. The Redis key itself lives CACHE_STALE_TTL seconds
+# longer. On a read:
+#   - fresh entries are served, except that each request picks the entry for
+#     early recomputation with a probability that grows as expiry nears
+#     (XFetch: now - delta * beta * log(rand) >= expires);
+#   - a request that needs a refresh takes a short lock (SET NX); only the
+#     lock holder recomputes (single flight), the others keep serving the
+#     stale payload, or, with nothing to serve, wait briefly for the holder.
+#     The lock holds a random token and is released only by its holder, so a
+#     compute outliving CACHE_LOCK_TIMEOUT cannot free the next holder's lock.
+# Empty results ("not found", no services) are cached too, for
+# NEGATIVE_CACHE_TTL.
+
+import asyncio
+import math
+import random
+import struct
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from .async_cache import async_cache
+
+_HEADER = struct.Struct("!dd")
+_POLL_INTERVAL = 0.05
+
+# Deletes KEYS[1] only while it still holds this request's token (ARGV[1])
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_lock = None
+
+
+def _release_lock_script():
+    global _release_lock
+    if _release_lock is None:
+        _release_lock = get_redis_connection("default").register_script(RELEASE_LOCK_SCRIPT)
+    return _release_lock
+
+
+def _lock_key(key):
+    return cache.make_key(f"{key}:lock")
+
+
+def _lock_token():
+    return uuid.uuid4().hex.encode()
+
+
+def _unpack(raw):
+    """(expires, delta, payload) of a stored entry, or None."""
+    if raw is None or len(raw) < _HEADER.size:
+        return None
+    expires, delta = _HEADER.unpack_from(raw)
+    return expires, delta, memoryview(raw)[_HEADER.size:]
+
+
+def _fresh(entry, now):
+    expires, delta, _ = entry
+    early = -delta * settings.CACHE_EARLY_EXPIRY_BETA * math.log(1.0 - random.random())
+    return now + early < expires
+
+
+def _pack(payload, empty, started, timeout):
+    """Entry bytes and the Redis expiry (seconds) for a computed payload."""
+    now = time.time()
+    timeout = settings.NEGATIVE_CACHE_TTL if empty else timeout
+    timeout *= random.uniform(1 - settings.CACHE_TTL_JITTER, 1 + settings.CACHE_TTL_JITTER)
+    return _HEADER.pack(now + timeout, now - started) + payload, int(timeout) + settings.CACHE_STALE_TTL
+
+
+def cached_bytes(key, compute, timeout):
+    """
+    Return (payload, cached): the bytes cached under `key`, or the payload of
+    compute(), which returns (payload, empty), stored for `timeout` seconds.
+    """
+    client = get_redis_connection("default")
+    redis_key = cache.make_key(key)
+
+    entry = _unpack(client.get(redis_key))
+    if entry is not None and _fresh(entry, time.time()):
+        return entry[2], True
+
+    lock_key = _lock_key(key)
+    token = _lock_token()
+    locked = client.set(lock_key, token, nx=True, ex=settings.CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            # Stale while another request revalidates
+            return entry[2], True
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_INTERVAL)
+            entry = _unpack(client.get(redis_key))
+            if entry is not None:
+                return entry[2], True
+        # The lock holder is too slow or gone; compute without the lock
+
+    try:
+        started = time.time()
+        payload, empty = compute()
+        raw, expiry = _pack(payload, empty, started, timeout)
+        client.set(redis_key, raw, ex=expiry)
+        return payload, False
+    finally:
+        if locked:
+            _release_lock_script()(keys=[lock_key], args=[token])
+
+
+async def acached_bytes(key, compute, timeout):
+    """Async cached_bytes(); `compute` is a coroutine function."""
+    redis_key = cache.make_key(key)
+
+    entry = _unpack(await async_cache.raw_get(redis_key))
+    if entry is not None and _fresh(entry, time.time()):
+        return entry[2], True
+
+    lock_key = _lock_key(key)
+    token = _lock_token()
+    locked = await async_cache.raw_set(lock_key, token, settings.CACHE_LOCK_TIMEOUT, nx=True)
+    if not locked:
+        if entry is not None:
+            return entry[2], True
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_POLL_INTERVAL)
+            entry = _unpack(await async_cache.raw_get(redis_key))
+            if entry is not None:
+                return entry[2], True
+
+    try:
+        started = time.time()
+        payload, empty = await compute()
+        raw, expiry = _pack(payload, empty, started, timeout)
+        await async_cache.raw_set(redis_key, raw, expiry)
+        return payload, False
+    finally:
+        if locked:
+            await async_cache.raw_eval(RELEASE_LOCK_SCRIPT, [lock_key], [token])
@@ -0,0 +1,298 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Nearby search cache.
+#
+# Instead of keying on the caller's raw coordinates, a nearby search is mapped
+# to a geohash cell plus a radius bucket. The cache holds every service within
+# `bucket + cell half-diagonal` of the cell centre, which is a superset of the
+# results for any caller inside that cell asking for a radius <= bucket. The
+# exact per-caller distance filter and sort then run in-process.
+#
+# Every cell carries a version token that is part of its cache keys. A write
+# only bumps the versions of the cells whose candidate set can contain the
+# old or new location of the service; stale entries simply expire.
+# Rendered map tiles are versioned per tile the same way.
+#
+# Candidates are cached in a packed binary form with every row pre-rendered
+# as JSON, so a hit only filters and concatenates bytes.
+
+import hashlib
+import json
+import struct
+import uuid
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import geo
+from .async_cache import async_cache
+from .rendering import render_json, weak_etag
+
+# Radius buckets (km) and the geohash precision used for each of them. Wider
+# searches reach tens of km and whole metros of candidates, too many to keep
+# in one value and filter in Python; they go straight to PostGIS.
+RADIUS_BUCKETS_KM = (1, 2, 5, 10)
+
+# Candidates are fetched with the database's spheroid distance but filtered
+# here with haversine; pad the reach so the sphere/spheroid gap never drops one.
+REACH_PADDING = 1.01
+
+# Row count of a packed candidate set (see pack_candidates); the packed
+# arrays use native byte order, as every worker reading them does
+_COUNT = struct.Struct("=I")
+
+# Cached in place of a cell with too many candidates
+OVERSIZED = b""
+
+
+def bucket_precision(bucket):
+    if bucket <= 2:
+        return 6    # ~1.2 x 0.6 km cells
+    return 5        # ~4.9 x 4.9 km cells
+
+
+def radius_bucket(radius_km):
+    for bucket in RADIUS_BUCKETS_KM:
+        if radius_km <= bucket:
+            return bucket
+    return None
+
+
+class NearbyCell:
+    def __init__(self, bucket, lat_idx, lng_idx):
+        self.bucket = bucket
+        self.precision = bucket_precision(bucket)
+        self.lat_idx = lat_idx
+        self.lng_idx = lng_idx
+
+    @classmethod
+    def for_search(cls, lat, lng, radius_km):
+        """Cell serving a search, or None if the radius is too wide to cache."""
+        bucket = radius_bucket(radius_km)
+        if bucket is None:
+            return None
+        lat_idx, lng_idx = geo.cell_index(lat, lng, bucket_precision(bucket))
+        return cls(bucket, lat_idx, lng_idx)
+
+    @property
+    def geohash(self):
+        return geo.cell_geohash(self.lat_idx, self.lng_idx, self.precision)
+
+    @property
+    def center(self):
+        return geo.cell_center(self.lat_idx, self.lng_idx, self.precision)
+
+    @property
+    def reach_km(self):
+        half_diagonal = geo.cell_half_diagonal_km(self.lat_idx, self.lng_idx, self.precision)
+        return (self.bucket + half_diagonal) * REACH_PADDING
+
+    @property
+    def version_key(self):
+        return f"nearby_version:{self.bucket}:{self.geohash}"
+
+    def cache_key(self, category, version, q="", metadata=None):
+        # Equal filters share an entry whatever their key order
+        digest = ""
+        if metadata is not None:
+            canonical = json.dumps(metadata, sort_keys=True, separators=(",", ":"))
+            digest = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+        return f"nearby:{self.bucket}:{self.geohash}:{version}:{category}:{q}:{digest}"
+
+    def __eq__(self, other):
+        return (self.bucket, self.lat_idx, self.lng_idx) == (other.bucket, other.lat_idx, other.lng_idx)
+
+    def __hash__(self):
+        return hash((self.bucket, self.lat_idx, self.lng_idx))
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _current_version(version_key):
+    version = cache.get(version_key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(version_key, version, timeout=settings.NEARBY_VERSION_TTL):
+            version = cache.get(version_key, version)
+    return version
+
+
+def cell_version(cell):
+    return _current_version(cell.version_key)
+
+
+async def acell_version(cell):
+    """Async cell_version()."""
+    version = await async_cache.get(cell.version_key)
+    if version is None:
+        version = _new_version()
+        if not await async_cache.add(cell.version_key, version, timeout=settings.NEARBY_VERSION_TTL):
+            version = await async_cache.get(cell.version_key, version)
+    return version
+
+
+def _tile_version_key(z, x, y):
+    return f"tile_version:{z}:{x}:{y}"
+
+
+def tile_cache_keys(prefix, tiles, category):
+    """{(z, x, y): cache key} for many tiles, reading their versions in one round trip."""
+    version_keys = {tile: _tile_version_key(*tile) for tile in tiles}
+    versions = cache.get_many(list(version_keys.values()))
+
+    keys = {}
+    for tile, version_key in version_keys.items():
+        version = versions.get(version_key) or _current_version(version_key)
+        keys[tile] = f"{prefix}:{tile[0]}:{tile[1]}:{tile[2]}:{version}:{category}"
+    return keys
+
+
+def tile_cache_key(prefix, z, x, y, category):
+    return tile_cache_keys(prefix, [(z, x, y)], category)[(z, x, y)]
+
+
+def affected_tiles(points):
+    return {
+        (z, *geo.tile_index(lat, lng, z))
+        for z in range(settings.TILE_MAX_ZOOM + 1)
+        for lat, lng in points
+    }
+
+
+def affected_cells(points):
+    """
+    Every cell whose candidate set can contain one of `points` ((lat, lng)
+    pairs). Points are grouped by the cell they fall in first, so a bulk
+    write of many nearby services costs about as much as a single one.
+    """
+    cells = set()
+    for bucket in RADIUS_BUCKETS_KM:
+        precision = bucket_precision(bucket)
+        sources = {geo.cell_index(lat, lng, precision) for lat, lng in points}
+
+        for lat_idx, lng_idx in sources:
+            src_lat, src_lng = geo.cell_center(lat_idx, lng_idx, precision)
+            src_half_diagonal = geo.cell_half_diagonal_km(lat_idx, lng_idx, precision)
+            search_km = (bucket + 1.1 * src_half_diagonal) * REACH_PADDING + src_half_diagonal
+
+            for target in geo.cells_around(src_lat, src_lng, search_km, precision):
+                cell = NearbyCell(bucket, *target)
+                center_lat, center_lng = cell.center
+                distance = geo.haversine_km(src_lat, src_lng, center_lat, center_lng)
+                if distance - src_half_diagonal <= cell.reach_km:
+                    cells.add(cell)
+    return cells
+
+
+def invalidate_locations(points):
+    """
+    Evict cached nearby results and map tiles covering any of `points`
+    ((lat, lng) pairs), in a single round trip.
+    """
+    points = [point for point in points if point is not None]
+    if not points:
+        return
+
+    version = _new_version()
+    version_keys = [cell.version_key for cell in affected_cells(points)]
+    version_keys += [_tile_version_key(*tile) for tile in affected_tiles(points)]
+    cache.set_many(
+        {key: version for key in version_keys},
+        timeout=settings.NEARBY_VERSION_TTL
+    )
+
+
+def service_detail_key(pk):
+    """
+    Cache key of a service's detail entry (see rendering.detail_entry).
+    Bump the version whenever the entry format changes, so entries in the
+    old format are never read.
+    """
+    return f"service_detail:v2:{pk}"
+
+
+def service_point(service):
+    if not service.location:
+        return None
+    return service.location.y, service.location.x
+
+
+def nearby_etag(cache_key, query):
+    """ETag of a cell-cached search: the versioned cache key plus the caller's own parameters."""
+    caller = (query["lat"], query["lng"], query["radius"], query["limit"], query["min_rating"])
+    return weak_etag(f"{cache_key}|{caller}".encode())
+
+
+def pack_candidates(rows):
+    """
+    Binary cache format of a cell's candidates: a row count, then the
+    (lat, lng, rating, similarity) of every row as doubles, the end offset of
+    every row, and every row pre-rendered as JSON. Reading it back needs no
+    unpickling and no JSON encoding.
+
+    More than NEARBY_CELL_MAX_CANDIDATES rows pack to OVERSIZED, which tells
+    readers to query the database directly instead.
+    """
+    if len(rows) > settings.NEARBY_CELL_MAX_CANDIDATES:
+        return OVERSIZED
+
+    numbers = array("d")
+    offsets = array("I")
+    bodies = []
+    end = 0
+
+    for row in rows:
+        # Only name searches (`q`) carry a similarity, used for ranking
+        similarity = row.pop("similarity", 0.0)
+        numbers.extend((row["lat"], row["lng"], row["rating"], similarity))
+        body = render_json(row)
+        bodies.append(body)
+        end += len(body)
+        offsets.append(end)
+
+    return _COUNT.pack(len(rows)) + numbers.tobytes() + offsets.tobytes() + b"".join(bodies)
+
+
+def is_oversized(packed):
+    return len(packed) == 0
+
+
+def select_candidates(packed, lat, lng, radius_km, limit=None, min_rating=None):
+    """
+    Exact distance filter and sort of packed candidates for one caller,
+    returned as a rendered JSON array. Candidates of a name search rank by
+    similarity first, then distance.
+    """
+    packed = memoryview(packed)
+    count = _COUNT.unpack_from(packed)[0]
+    numbers_end = _COUNT.size + 32 * count
+    offsets_end = numbers_end + 4 * count
+
+    numbers = array("d")
+    numbers.frombytes(packed[_COUNT.size:numbers_end])
+    offsets = array("I")
+    offsets.frombytes(packed[numbers_end:offsets_end])
+    bodies = packed[offsets_end:]
+
+    in_range = []
+    for i in range(count):
+        item_lat, item_lng, rating, similarity = numbers[4 * i:4 * i + 4]
+        if min_rating is not None and rating < min_rating:
+            continue
+        distance = geo.haversine_km(lat, lng, item_lat, item_lng)
+        if distance <= radius_km:
+            in_range.append((-similarity, distance, i))
+
+    in_range.sort()
+    if limit is not None:
+        in_range = in_range[:limit]
+
+    return b"[" + b",".join(
+        bodies[offsets[i - 1] if i else 0:offsets[i]] for _, _, i in in_range
+    ) + b"]"
@@ -0,0 +1,163 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Primary/replica routing with read-your-writes.
+#
+# Writes go to "default"; reads go to a random DATABASE_REPLICAS entry unless
+# the current request must see the primary:
+#   - it is a write request (POST, PUT, PATCH, DELETE), or it already wrote,
+#   - or its user wrote something in the last READ_YOUR_WRITES_SECONDS.
+# Views whose POSTs only read (e.g. batch searches) set `replica_reads = True`
+# to be routed like a GET. The second case is tracked with a short-lived
+# signed `db_pin` cookie (the writer's user id) set by ReplicaRoutingMiddleware
+# and checked right after authentication, so it costs no cache round trip.
+# Clients that drop cookies read from replicas right after their writes.
+# Routing state lives in context variables, so it is per request under both
+# WSGI threads and ASGI tasks.
+#
+# Shared caches (service detail, nearby cells, tiles) are always filled from
+# the primary: a fill read from a lagging replica right after an invalidation
+# would be served to every user, the writer included, until it expires.
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections, router
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "db_pin"
+PIN_SALT = "users.db_router.pin"
+
+# Database the shared caches are filled from
+CACHE_FILL_DB = "default"
+
+_use_primary = ContextVar("use_primary", default=False)
+_wrote = ContextVar("wrote", default=False)
+
+
+def replicas_enabled():
+    return bool(settings.DATABASE_REPLICAS)
+
+
+def pin_recent_writer(request, user):
+    """Send this request's reads to the primary if `user` wrote recently."""
+    if not replicas_enabled() or _use_primary.get():
+        return
+
+    pinned = request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_SALT, max_age=settings.READ_YOUR_WRITES_SECONDS
+    )
+    if pinned == str(user.pk):
+        _use_primary.set(True)
+
+
+def read_connection(model):
+    """Connection for raw SQL reads of `model`, routed like ORM reads."""
+    return connections[router.db_for_read(model)]
+
+
+def fill_connection():
+    """Connection for raw SQL reads that fill a shared cache."""
+    return connections[CACHE_FILL_DB]
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_primary.get() or not settings.DATABASE_REPLICAS:
+            return "default"
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Later reads in this request must see the write
+        _use_primary.set(True)
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def _start(request):
+    return (
+        _use_primary.set(request.method not in SAFE_METHODS),
+        _wrote.set(False),
+    )
+
+
+def _writer_id(request):
+    # DRF sets the authenticated user on the underlying HttpRequest too
+    user = getattr(request, "user", None)
+    if _wrote.get() and replicas_enabled() and user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def _pin(response, user_id):
+    response.set_signed_cookie(
+        PIN_COOKIE, str(user_id), salt=PIN_SALT, max_age=settings.READ_YOUR_WRITES_SECONDS,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax"
+    )
+
+
+def _finish(tokens):
+    _use_primary.reset(tokens[0])
+    _wrote.reset(tokens[1])
+
+
+def _route_view(view_func):
+    # Class-based views keep their class on the view function (as_view)
+    view_class = getattr(view_func, "view_class", None)
+    if getattr(view_class, "replica_reads", False) and not _wrote.get():
+        _use_primary.set(False)
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # A sync process_view would be run in a thread under ASGI
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+
+        tokens = _start(request)
+        try:
+            response = self.get_response(request)
+            user_id = _writer_id(request)
+            if user_id is not None:
+                _pin(response, user_id)
+            return response
+        finally:
+            _finish(tokens)
+
+    async def _acall(self, request):
+        tokens = _start(request)
+        try:
+            response = await self.get_response(request)
+            user_id = _writer_id(request)
+            if user_id is not None:
+                _pin(response, user_id)
+            return response
+        finally:
+            _finish(tokens)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _route_view(view_func)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _route_view(view_func)
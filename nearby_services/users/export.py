@@ -0,0 +1,100 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Streaming export of the Service catalog as NDJSON or a GeoJSON
+# FeatureCollection. Rows are read through a server-side cursor
+# (`.iterator(chunk_size=...)`) and emitted in small text chunks, so memory
+# use stays flat whatever the table size.
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from .functions import X, Y
+from .models import Service
+
+EXPORT_FORMATS = ("ndjson", "geojson")
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+}
+
+EXPORT_FIELDS = ("id", "name", "category", "rating", "metadata", "created_at", "updated_at")
+
+
+def parse_timestamp(value, name):
+    if not value:
+        return None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid {name}, expected an ISO 8601 datetime")
+    return parsed
+
+
+def export_queryset(category=None, updated_after=None, updated_before=None):
+    services = Service.objects.all()
+
+    if category:
+        services = services.filter(category=category)
+    if updated_after:
+        services = services.filter(updated_at__gte=updated_after)
+    if updated_before:
+        services = services.filter(updated_at__lt=updated_before)
+
+    return services.order_by("id")
+
+
+def _rows(queryset, chunk_size):
+    return queryset.annotate(
+        lat=Y("location"),
+        lng=X("location"),
+    ).values(*EXPORT_FIELDS, "lat", "lng").iterator(chunk_size=chunk_size)
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def _ndjson_lines(queryset, chunk_size):
+    for row in _rows(queryset, chunk_size):
+        yield _dumps(row) + "\n"
+
+
+def _geojson_lines(queryset, chunk_size):
+    yield '{"type":"FeatureCollection","features":['
+
+    separator = ""
+    for row in _rows(queryset, chunk_size):
+        lat, lng = row.pop("lat"), row.pop("lng")
+        feature = {
+            "type": "Feature",
+            "id": row["id"],
+            "geometry": {"type": "Point", "coordinates": [lng, lat]},
+            "properties": row,
+        }
+        yield separator + _dumps(feature)
+        separator = ",\n"
+
+    yield "]}\n"
+
+
+def stream_export(queryset, export_format, chunk_size=None):
+    """Yield the export as text chunks of roughly `chunk_size` rows each."""
+    chunk_size = chunk_size or settings.SERVICE_EXPORT_CHUNK_SIZE
+    lines = _ndjson_lines if export_format == "ndjson" else _geojson_lines
+
+    buffer = []
+    for line in lines(queryset, chunk_size):
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+
+    if buffer:
+        yield "".join(buffer)
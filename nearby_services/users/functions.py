@@ -0,0 +1,63 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Extra PostGIS functions for the ORM
+
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.db.models.functions import GeoFunc
+from django.db.models import BooleanField, F, FloatField, Func, Value
+
+
+class X(GeoFunc):
+    function = "ST_X"
+    output_field = FloatField()
+    arity = 1
+
+
+class Y(GeoFunc):
+    function = "ST_Y"
+    output_field = FloatField()
+    arity = 1
+
+
+class _GeographyFunc(Func):
+    """
+    Operates on `(column)::geography`, spelled exactly like the expression
+    of the users_service_location_geog_idx index so the planner can use it.
+    """
+    sql_template = None
+
+    def __init__(self, column, point, *expressions, **extra):
+        point = Value(point, output_field=GeometryField(srid=point.srid))
+        super().__init__(F(column), point, *expressions, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql_parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sql_parts.append(sql)
+            params.extend(expression_params)
+        return self.sql_template.format(*sql_parts), params
+
+
+class DWithinGeography(_GeographyFunc):
+    """ST_DWithin(column::geography, point::geography, metres) as a filter."""
+    sql_template = "ST_DWithin(({})::geography, ({})::geography, {})"
+    output_field = BooleanField()
+
+    def __init__(self, column, point, distance_m):
+        super().__init__(column, point, Value(float(distance_m)))
+
+
+class KNNGeography(_GeographyFunc):
+    """Index-assisted `<->` great-circle distance, for ORDER BY ... LIMIT k."""
+    sql_template = "({})::geography <-> ({})::geography"
+    output_field = FloatField()
+
+
+class DistanceGeography(_GeographyFunc):
+    """Exact ST_Distance in metres between column::geography and a point."""
+    sql_template = "ST_Distance(({})::geography, ({})::geography)"
+    output_field = FloatField()
@@ -0,0 +1,127 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Geohash grid cells and great-circle helpers.
+# Cells are addressed by their (lat_idx, lng_idx) position in the geohash grid
+# of a given precision, which makes neighbouring cells easy to enumerate.
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _grid_bits(precision):
+    # Geohash interleaves longitude first, so it gets the odd bit
+    total = 5 * precision
+    return total - total // 2, total // 2
+
+
+def cell_index(lat, lng, precision):
+    lng_bits, lat_bits = _grid_bits(precision)
+    lat_idx = int((lat + 90.0) / 180.0 * (1 << lat_bits))
+    lat_idx = max(0, min(lat_idx, (1 << lat_bits) - 1))
+    lng_idx = int(((lng + 180.0) % 360.0) / 360.0 * (1 << lng_bits))
+    return lat_idx, lng_idx
+
+
+def cell_geohash(lat_idx, lng_idx, precision):
+    lng_bits, lat_bits = _grid_bits(precision)
+    code = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            lng_bits -= 1
+            bit = (lng_idx >> lng_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (lat_idx >> lat_bits) & 1
+        code = (code << 1) | bit
+
+    return "".join(
+        _BASE32[(code >> (5 * (precision - 1 - i))) & 31]
+        for i in range(precision)
+    )
+
+
+def cell_size(precision):
+    """(lat_degrees, lng_degrees) covered by one cell."""
+    lng_bits, lat_bits = _grid_bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def cell_bounds(lat_idx, lng_idx, precision):
+    """(south, west, north, east) of a cell."""
+    lat_size, lng_size = cell_size(precision)
+    south = -90.0 + lat_idx * lat_size
+    west = -180.0 + lng_idx * lng_size
+    return south, west, south + lat_size, west + lng_size
+
+
+def cell_center(lat_idx, lng_idx, precision):
+    south, west, north, east = cell_bounds(lat_idx, lng_idx, precision)
+    return (south + north) / 2, (west + east) / 2
+
+
+def cell_half_diagonal_km(lat_idx, lng_idx, precision):
+    """Distance from the cell centre to its farthest corner."""
+    south, west, north, east = cell_bounds(lat_idx, lng_idx, precision)
+    center_lat, center_lng = (south + north) / 2, (west + east) / 2
+    return max(
+        haversine_km(center_lat, center_lng, south, east),
+        haversine_km(center_lat, center_lng, north, east),
+    )
+
+
+def cells_around(lat, lng, distance_km, precision):
+    """
+    Yield every cell overlapping the bounding box of a circle of
+    `distance_km` around (lat, lng). Callers do their own exact check.
+    """
+    lng_bits, lat_bits = _grid_bits(precision)
+    lat_size, lng_size = cell_size(precision)
+
+    d_lat = distance_km / KM_PER_DEGREE
+    max_abs_lat = min(90.0, abs(lat) + d_lat)
+    cos_lat = math.cos(math.radians(max_abs_lat))
+    d_lng = 360.0 if cos_lat < 1e-6 else min(360.0, d_lat / cos_lat)
+
+    lat_lo, _ = cell_index(max(-90.0, lat - d_lat), lng, precision)
+    lat_hi, _ = cell_index(min(90.0, lat + d_lat), lng, precision)
+
+    lng_cells = 1 << lng_bits
+    if 2 * d_lng >= 360.0:
+        lng_range = range(lng_cells)
+    else:
+        _, lng_lo = cell_index(lat, lng - d_lng, precision)
+        steps = int(math.ceil(2 * d_lng / lng_size)) + 1
+        lng_range = [(lng_lo + step) % lng_cells for step in range(min(steps, lng_cells))]
+
+    for lat_idx in range(lat_lo, lat_hi + 1):
+        for lng_idx in lng_range:
+            yield lat_idx, lng_idx
+
+
+# Web Mercator (slippy map) tiles
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_index(lat, lng, zoom):
+    n = 1 << zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return max(0, min(x, n - 1)), max(0, min(y, n - 1))
@@ -0,0 +1,167 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Bulk Service ingestion from CSV, NDJSON or GeoJSON.
+# Records are validated in batches with ServiceSerializer, inserted with large
+# bulk_create batches inside a single transaction, and the nearby cache is
+# invalidated once for the whole import.
+
+import csv
+import json
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import invalidate_locations, service_detail_key
+from .models import Service
+from .serializers import ServiceSerializer
+from .spatial_index import publish_changes
+
+IMPORT_FORMATS = ("csv", "ndjson", "geojson")
+
+
+class IngestError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid record(s)")
+        self.errors = errors
+
+
+def _csv_records(stream):
+    for row in csv.DictReader(stream):
+        if row.get("metadata"):
+            row["metadata"] = json.loads(row["metadata"])
+        else:
+            row.pop("metadata", None)
+        yield row
+
+
+def _ndjson_records(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _feature_record(feature):
+    """Serializer input for one GeoJSON feature; raises ValueError if malformed."""
+    if not isinstance(feature, dict):
+        raise ValueError("Expected a GeoJSON Feature object")
+
+    properties = feature.get("properties") or {}
+    geometry = feature.get("geometry") or {}
+    if not isinstance(properties, dict):
+        raise ValueError("properties must be an object")
+    if not isinstance(geometry, dict):
+        raise ValueError("geometry must be an object")
+
+    record = dict(properties)
+    if geometry.get("type") == "Point":
+        coordinates = geometry.get("coordinates")
+        if not (isinstance(coordinates, list) and len(coordinates) >= 2
+                and _is_number(coordinates[0]) and _is_number(coordinates[1])):
+            raise ValueError("Point coordinates must be [longitude, latitude]")
+        record["longitude"], record["latitude"] = coordinates[:2]
+    return record
+
+
+def _geojson_records(stream):
+    collection = json.load(stream)
+    features = collection.get("features") if isinstance(collection, dict) else None
+    if not isinstance(features, list):
+        raise IngestError([{"record": None, "errors": "Expected a GeoJSON FeatureCollection"}])
+
+    # The document is in memory already, so check every feature's structure
+    # before the first insert and report the malformed ones together
+    records, errors = [], []
+    for index, feature in enumerate(features):
+        try:
+            records.append(_feature_record(feature))
+        except ValueError as e:
+            errors.append({"record": index, "errors": str(e)})
+
+    if errors:
+        raise IngestError(errors[:settings.SERVICE_IMPORT_MAX_ERRORS])
+    yield from records
+
+
+def parse_records(stream, import_format):
+    """Yield ServiceSerializer input dicts from a text stream."""
+    readers = {
+        "csv": _csv_records,
+        "ndjson": _ndjson_records,
+        "geojson": _geojson_records,
+    }
+    return readers[import_format](stream)
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_services(records, created_by, batch_size=None):
+    """
+    Validate and insert `records` atomically; returns the number created.
+    Raises IngestError (and inserts nothing) if any record is invalid.
+    """
+    batch_size = batch_size or settings.SERVICE_IMPORT_BATCH_SIZE
+    errors = []
+    points = []
+    service_ids = []
+    created = 0
+
+    try:
+        with transaction.atomic():
+            offset = 0
+            for batch in _batches(records, batch_size):
+                serializer = ServiceSerializer(data=batch, many=True)
+
+                if not serializer.is_valid():
+                    errors.extend(
+                        {"record": offset + i, "errors": row_errors}
+                        for i, row_errors in enumerate(serializer.errors) if row_errors
+                    )
+                    if len(errors) >= settings.SERVICE_IMPORT_MAX_ERRORS:
+                        break
+                offset += len(batch)
+
+                # Keep validating after the first error to report more of
+                # them, but stop inserting; the transaction rolls back anyway
+                if errors:
+                    continue
+
+                services = []
+                for data in serializer.validated_data:
+                    lat = data.pop("latitude")
+                    lng = data.pop("longitude")
+                    services.append(Service(location=Point(lng, lat, srid=4326), created_by=created_by, **data))
+                    points.append((lat, lng))
+
+                Service.objects.bulk_create(services, batch_size=batch_size)
+                service_ids.extend(service.pk for service in services)
+                created += len(services)
+
+            if errors:
+                raise IngestError(errors[:settings.SERVICE_IMPORT_MAX_ERRORS])
+
+    except json.JSONDecodeError as e:
+        raise IngestError([{"record": None, "errors": f"Invalid JSON: {e}"}])
+
+    # bulk_create sends no post_save signals
+    invalidate_locations(points)
+    cache.delete_many([service_detail_key(service_id) for service_id in service_ids])
+    publish_changes(service_ids)
+    return created
@@ -0,0 +1,40 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.export import EXPORT_FORMATS, export_queryset, parse_timestamp, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream the Service catalog as NDJSON or a GeoJSON FeatureCollection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--category")
+        parser.add_argument("--updated-after", help="ISO 8601 datetime (inclusive)")
+        parser.add_argument("--updated-before", help="ISO 8601 datetime (exclusive)")
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument("--output", "-o", help="File to write to (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            services = export_queryset(
+                category=options["category"],
+                updated_after=parse_timestamp(options["updated_after"], "--updated-after"),
+                updated_before=parse_timestamp(options["updated_before"], "--updated-before"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = stream_export(services, options["format"], options["chunk_size"])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
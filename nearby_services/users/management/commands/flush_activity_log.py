@@ -0,0 +1,16 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+from django.core.management.base import BaseCommand
+
+from users.audit import flush_activity_log
+
+
+class Command(BaseCommand):
+    help = "Insert queued ActivityLog entries now (e.g. before a deploy or from cron)"
+
+    def handle(self, *args, **options):
+        flushed = flush_activity_log()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} activity log entries"))
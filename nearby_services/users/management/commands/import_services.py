@@ -0,0 +1,42 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.ingest import IMPORT_FORMATS, IngestError, import_services, parse_records
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Bulk import services from a CSV, NDJSON or GeoJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+        parser.add_argument("--created-by", required=True, help="Email of the owning user")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        import_format = options["format"] or os.path.splitext(options["path"])[1].lstrip(".").lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Unknown format {import_format!r}, pass --format")
+
+        created_by = User.objects.filter(email=options["created_by"]).first()
+        if not created_by:
+            raise CommandError(f"User {options['created_by']} not found")
+
+        with open(options["path"], encoding="utf-8", newline="") as stream:
+            try:
+                created = import_services(
+                    parse_records(stream, import_format), created_by, options["batch_size"]
+                )
+            except IngestError as e:
+                for error in e.errors:
+                    self.stderr.write(f"record {error['record']}: {error['errors']}")
+                raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} services"))
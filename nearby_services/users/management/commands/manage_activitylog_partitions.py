@@ -0,0 +1,57 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming ActivityLog partitions and detach or drop expired ones (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=settings.ACTIVITY_LOG_PARTITIONS_AHEAD,
+                            help="Months of partitions to create in advance")
+        parser.add_argument("--retention-months", type=int, default=settings.ACTIVITY_LOG_RETENTION_MONTHS,
+                            help="Partitions (and default partition rows) older than this are removed; 0 keeps everything")
+        parser.add_argument("--detach-only", action="store_true",
+                            help="Detach expired partitions (e.g. to archive them) instead of dropping them")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        now = datetime.now(timezone.utc)
+        months = settings.ACTIVITY_LOG_PARTITION_MONTHS
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for name in partitions.ensure_partitions(
+                cursor, now, partitions.add_months(now, options["ahead"]), months
+            ):
+                self.stdout.write(f"Created {name}")
+
+            if options["retention_months"] > 0:
+                cutoff = partitions.add_months(now, -options["retention_months"])
+                verb = "Detached" if options["detach_only"] else "Dropped"
+
+                for name in partitions.expired_partitions(cursor, cutoff):
+                    partitions.drop_partition(cursor, name, detach_only=options["detach_only"])
+                    self.stdout.write(f"{verb} {name}")
+
+                # Rows in the default partition have no partition to expire
+                # with; they are deleted, unless expired rows are being kept
+                if not options["detach_only"]:
+                    purged = partitions.purge_default_partition(cursor, cutoff)
+                    if purged:
+                        self.stdout.write(f"Deleted {purged} expired rows from {partitions.DEFAULT_PARTITION}")
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Dry run, nothing was changed")
+                return
+
+        self.stdout.write(self.style.SUCCESS("ActivityLog partitions are up to date"))
@@ -0,0 +1,24 @@
+# Radius searches filter on ST_DWithin(location::geography, ...), which can
+# only use an index built on that same expression.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS users_service_location_geog_idx "
+                "ON users_service USING GIST ((location::geography));"
+            ),
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS users_service_location_geog_idx;",
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 10:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_activitylog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='activitylog',
+            options={'ordering': ['-timestamp', '-id']},
+        ),
+        AddIndexConcurrently(
+            model_name='activitylog',
+            index=models.Index(fields=['-timestamp', '-id'], name='activitylog_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='activitylog',
+            index=models.Index(fields=['action', '-timestamp', '-id'], name='activitylog_action_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='activitylog',
+            index=models.Index(fields=['performed_by', '-timestamp', '-id'], name='activitylog_actor_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='activitylog',
+            index=models.Index(fields=['target_user', '-timestamp', '-id'], name='activitylog_target_time_idx'),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Rebuild users_activitylog as a table range-partitioned on "timestamp"
+# (see users/partitions.py). Postgres requires the partition key in the
+# primary key, so it becomes (id, timestamp); ids still come from a single
+# sequence and stay unique. Existing rows are copied into monthly partitions
+# created for their months, up to PARTITIONS_AHEAD months from now.
+#
+# The copy holds an ACCESS EXCLUSIVE lock on the table from start to end, so
+# run it in a maintenance window on a large table. Reversing it rebuilds a
+# plain table the same way.
+#
+# Everything this needs is inlined below, so later changes to the app's
+# partition helpers or settings do not change what this migration does.
+
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TABLE = "users_activitylog"
+DEFAULT_PARTITION = f"{TABLE}_default"
+COLUMNS = '"id", "action", "timestamp", "details", "performed_by_id", "target_user_id"'
+PARTITIONS_AHEAD = 3
+
+INDEXES = {
+    "activitylog_time_idx": '"timestamp" DESC, "id" DESC',
+    "activitylog_action_time_idx": '"action", "timestamp" DESC, "id" DESC',
+    "activitylog_actor_time_idx": '"performed_by_id", "timestamp" DESC, "id" DESC',
+    "activitylog_target_time_idx": '"target_user_id", "timestamp" DESC, "id" DESC',
+}
+
+USER_FKS = """
+    "performed_by_id" bigint NOT NULL
+        REFERENCES users_user ("id") DEFERRABLE INITIALLY DEFERRED,
+    "target_user_id" bigint NULL
+        REFERENCES users_user ("id") DEFERRABLE INITIALLY DEFERRED
+"""
+
+
+def _month_start(when, months=0):
+    index = when.year * 12 + when.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _drop_indexes(cursor):
+    for name in INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _create_indexes(cursor):
+    # On a partitioned table these cascade to every current and future partition
+    for name, columns in INDEXES.items():
+        cursor.execute(f"CREATE INDEX {name} ON {TABLE} ({columns})")
+
+
+def partition_activitylog(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned")
+        cursor.execute(f"ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_unpartitioned_pkey")
+        _drop_indexes(cursor)
+
+        cursor.execute(f"CREATE SEQUENCE {TABLE}_partitioned_id_seq")
+        cursor.execute(
+            f"SELECT setval('{TABLE}_partitioned_id_seq', "
+            f"COALESCE((SELECT MAX(id) FROM {TABLE}_unpartitioned), 0) + 1, false)"
+        )
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                "id" bigint NOT NULL DEFAULT nextval('{TABLE}_partitioned_id_seq'),
+                "action" varchar(50) NOT NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                "details" jsonb NULL,
+                {USER_FKS},
+                PRIMARY KEY ("id", "timestamp")
+            ) PARTITION BY RANGE ("timestamp")
+        """)
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_partitioned_id_seq OWNED BY {TABLE}."id"')
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+        # One partition per month from the oldest row on; the default
+        # partition is still empty, so none of them has rows to move
+        now = datetime.now(timezone.utc)
+        cursor.execute(f'SELECT MIN("timestamp") FROM {TABLE}_unpartitioned')
+        start = _month_start(cursor.fetchone()[0] or now)
+        last = _month_start(now, PARTITIONS_AHEAD)
+        while start <= last:
+            end = _month_start(start, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{start:%Y%m} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+            start = end
+
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_unpartitioned")
+        cursor.execute(f"DROP TABLE {TABLE}_unpartitioned")
+        _create_indexes(cursor)
+
+
+def unpartition_activitylog(apps, schema_editor):
+    # Partitions detached for archiving are standalone tables by now and are
+    # left alone; their rows are not copied back
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned")
+        cursor.execute(f"ALTER INDEX {TABLE}_pkey RENAME TO {TABLE}_partitioned_pkey")
+        _drop_indexes(cursor)
+
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+                "action" varchar(50) NOT NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                "details" jsonb NULL,
+                {USER_FKS}
+            )
+        """)
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_partitioned")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)"
+        )
+        # Drops every attached partition and the owned id sequence too
+        cursor.execute(f"DROP TABLE {TABLE}_partitioned")
+        _create_indexes(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_activitylog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activitylog, unpartition_activitylog),
+    ]
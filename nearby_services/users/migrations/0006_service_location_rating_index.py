@@ -0,0 +1,27 @@
+# min_rating and sort=relevance filter on rating next to the radius check.
+# A multicolumn GiST index over (location::geography, rating) answers both
+# conditions in one index scan; btree_gist provides the GiST rating opclass.
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0005_partition_activitylog'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS users_service_geog_rating_idx "
+                "ON users_service USING GIST ((location::geography), rating);"
+            ),
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS users_service_geog_rating_idx;",
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 11:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0006_service_location_rating_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'], name='service_name_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0007_service_name_trgm_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['metadata'], name='service_metadata_gin_idx', opclasses=['jsonb_path_ops']
+            ),
+        ),
+    ]
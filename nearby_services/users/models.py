@@ -1,10 +1,12 @@
 __author__ = "Megha Shinde"
 __date__ = "16-02-2026"
 __lastupdatedby__ = "Megha Shinde"
-__lastupdateddate__ = "18-02-2026"
+__lastupdateddate__ = "18-10-2026"
 
 from django.contrib.auth.models import AbstractUser
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -37,6 +39,14 @@ class Service(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Trigram index for fuzzy/prefix name search (`q` on nearby)
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="service_name_trgm_idx"),
+            # Containment (`metadata @> {...}`) filters on nearby and list
+            GinIndex(fields=["metadata"], opclasses=["jsonb_path_ops"], name="service_metadata_gin_idx"),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -50,9 +60,18 @@ class ActivityLog(models.Model):
     performed_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="performed_actions")
     target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="targeted_actions", null=True, blank=True)
     action = models.CharField(max_length=50, choices=ACTION_CHOICES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is recorded, which can be before it is flushed
+    timestamp = models.DateTimeField(default=timezone.now)
     details = models.JSONField(blank=True, null=True)
 
     class Meta:
-        ordering = ["-timestamp"]
+        ordering = ["-timestamp", "-id"]
+        # One per filter of the activity log API, each ending in the keyset
+        # ordering so a filtered page is a single index range scan
+        indexes = [
+            models.Index(fields=["-timestamp", "-id"], name="activitylog_time_idx"),
+            models.Index(fields=["action", "-timestamp", "-id"], name="activitylog_action_time_idx"),
+            models.Index(fields=["performed_by", "-timestamp", "-id"], name="activitylog_actor_time_idx"),
+            models.Index(fields=["target_user", "-timestamp", "-id"], name="activitylog_target_time_idx"),
+        ]
 
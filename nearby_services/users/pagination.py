@@ -0,0 +1,120 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Keyset (cursor) pagination.
+# A page is fetched with `WHERE (key) > (last key) ORDER BY key LIMIT n`, so
+# every page costs the same index range scan no matter how deep it is. For
+# multi-column keys the row comparison is expanded into ORs plus a range on
+# the leading column, which is what bounds the index scan.
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def parse_page_size(value, default, maximum):
+    if value in (None, ""):
+        return default
+
+    try:
+        page_size = int(value)
+    except ValueError:
+        page_size = 0
+    if not 1 <= page_size <= maximum:
+        raise ValueError(f"page_size must be between 1 and {maximum}")
+    return page_size
+
+
+def _after(ordering, values):
+    """Q for rows strictly after `values` in `ordering` (a row comparison)."""
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        name = ordering[i].lstrip("-")
+        lookup = "lt" if ordering[i].startswith("-") else "gt"
+        strictly_after = Q(**{f"{name}__{lookup}": values[i]})
+        if i == len(ordering) - 1:
+            condition = strictly_after
+        else:
+            condition = strictly_after | (Q(**{name: values[i]}) & condition)
+
+    if len(ordering) > 1:
+        # Postgres cannot turn the OR above into an index bound; the
+        # redundant range on the leading key gives the scan its start
+        name = ordering[0].lstrip("-")
+        lookup = "lte" if ordering[0].startswith("-") else "gte"
+        condition = Q(**{f"{name}__{lookup}": values[0]}) & condition
+    return condition
+
+
+def _page_queryset(queryset, ordering, cursor, page_size):
+    fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in ordering]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(fields):
+            raise InvalidCursor("Invalid cursor")
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except ValidationError:
+            raise InvalidCursor("Invalid cursor")
+        queryset = queryset.filter(_after(ordering, values))
+
+    return queryset.order_by(*ordering)[:page_size + 1], fields
+
+
+def _page(rows, fields, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([_value(rows[-1], field) for field in fields])
+    return rows, next_cursor
+
+
+def keyset_page(queryset, ordering, cursor, page_size):
+    """
+    Return (rows, next_cursor) for one page of `queryset` ordered by
+    `ordering` (e.g. ["id"] or ["-timestamp", "-id"]). The ordering must be
+    unique, so the last field is normally the primary key.
+    """
+    page, fields = _page_queryset(queryset, ordering, cursor, page_size)
+    return _page(list(page), fields, page_size)
+
+
+async def akeyset_page(queryset, ordering, cursor, page_size):
+    """Async keyset_page()."""
+    page, fields = _page_queryset(queryset, ordering, cursor, page_size)
+    return _page([row async for row in page], fields, page_size)
+
+
+def _value(row, field):
+    # Works for model instances as well as .values() dicts
+    if isinstance(row, dict):
+        value = row[field.attname] if field.attname in row else row[field.name]
+    else:
+        value = getattr(row, field.attname)
+    return value.isoformat() if hasattr(value, "isoformat") else value
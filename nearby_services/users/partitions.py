@@ -0,0 +1,129 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Range partitions of the ActivityLog table on "timestamp".
+# Each partition spans ACTIVITY_LOG_PARTITION_MONTHS calendar months (UTC),
+# is named after its first month (users_activitylog_p202610) and rows outside
+# every partition land in the default partition. Queries bounded in time
+# prune to the partitions they overlap; retention detaches or drops whole
+# partitions instead of deleting rows.
+#
+# All helpers take a DB-API cursor so the migration can use them too.
+
+import re
+from datetime import datetime, timezone
+
+from django.utils.dateparse import parse_datetime
+
+TABLE = "users_activitylog"
+DEFAULT_PARTITION = f"{TABLE}_default"
+COLUMNS = '"id", "action", "timestamp", "details", "performed_by_id", "target_user_id"'
+
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_start(when, months):
+    """Start of the partition containing `when`."""
+    index = when.year * 12 + when.month - 1
+    index -= index % months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def existing_partitions(cursor):
+    """[(name, start, end)] of the range partitions, oldest first."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        [TABLE],
+    )
+
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = _BOUNDS.search(bound or "")
+        if match:
+            partitions.append((name, parse_datetime(match.group(1)), parse_datetime(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(cursor, start, end):
+    """
+    Create the partition for [start, end), moving any rows for that range
+    out of the default partition (Postgres refuses to attach over them).
+    """
+    name = partition_name(start)
+
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE "timestamp" >= %s AND "timestamp" < %s)',
+        [start, end],
+    )
+    has_stray_rows = cursor.fetchone()[0]
+
+    if has_stray_rows:
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+
+    cursor.execute(
+        f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+
+    if has_stray_rows:
+        cursor.execute(
+            f'INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM {DEFAULT_PARTITION} '
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s',
+            [start, end],
+        )
+        cursor.execute(
+            f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= %s AND "timestamp" < %s',
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+
+    return name
+
+
+def ensure_partitions(cursor, first, last, months):
+    """Create every missing partition from the one holding `first` to the one holding `last`."""
+    existing = [(start, end) for _, start, end in existing_partitions(cursor)]
+    created = []
+
+    start = partition_start(first, months)
+    while start <= last:
+        end = add_months(start, months)
+        # Skip ranges already covered, including by partitions created
+        # under a different ACTIVITY_LOG_PARTITION_MONTHS
+        if not any(s < end and start < e for s, e in existing):
+            created.append(create_partition(cursor, start, end))
+        start = end
+
+    return created
+
+
+def expired_partitions(cursor, cutoff):
+    """Partitions whose every row is older than `cutoff`."""
+    return [name for name, _, end in existing_partitions(cursor) if end <= cutoff]
+
+
+def drop_partition(cursor, name, detach_only=False):
+    cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+    if not detach_only:
+        cursor.execute(f"DROP TABLE {name}")
+
+
+def purge_default_partition(cursor, cutoff):
+    """Delete rows older than `cutoff` from the default partition; returns how many."""
+    cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" < %s', [cutoff])
+    return cursor.rowcount
@@ -0,0 +1,123 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Pre-rendered JSON response bodies.
+# Cached responses are stored as the final body bytes (gzip-compressed where
+# the whole body is cacheable) and written straight into an HttpResponse, with
+# the same JSON formatting as DRF's JSONRenderer.
+#
+# Also the validators for service reads: weak ETags (bodies of equal data can
+# still differ in the "(cached)" message and content coding), If-None-Match
+# handling and Cache-Control.
+
+import gzip
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.utils.encoders import JSONEncoder
+
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def render_json(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def gzip_json(data):
+    # mtime=0 keeps equal bodies byte-identical
+    return gzip.compress(render_json(data), mtime=0)
+
+
+def envelope_bytes(message, data_json):
+    """A success envelope around already rendered `data` JSON."""
+    head = render_json({"status": "success", "error_code": 0, "message": message})
+    return head[:-1] + b',"data":' + data_json + b"}"
+
+
+def json_response(body, status=200):
+    return HttpResponse(bytes(body), status=status, content_type="application/json")
+
+
+def gzip_json_response(request, body, etag=None):
+    """Serve a gzip body as is, or decompressed for clients without gzip."""
+    if _ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+        response = json_response(body)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = json_response(gzip.decompress(body))
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return with_validators(response, etag)
+
+
+def weak_etag(data):
+    return f'W/"{hashlib.sha1(data).hexdigest()[:20]}"'
+
+
+def etag_matches(request, etag):
+    """If-None-Match check, with the weak comparison RFC 9110 asks for."""
+    header = request.headers.get("If-None-Match")
+    if not header or not etag:
+        return False
+
+    tags = parse_etags(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def with_validators(response, etag=None):
+    """Cache-Control for authenticated service reads, plus the ETag if any."""
+    if etag:
+        response["ETag"] = etag
+    patch_cache_control(response, private=True, max_age=settings.SERVICE_READ_MAX_AGE)
+    return response
+
+
+def not_modified(etag):
+    return with_validators(HttpResponseNotModified(), etag)
+
+
+def etag_json_response(request, body, etag=None):
+    """JSON response validated by `etag`, or a hash of its body (uncached searches)."""
+    etag = etag or weak_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_validators(json_response(body), etag)
+
+
+def service_etag(service_id, updated_at):
+    return f'W/"{service_id}-{updated_at:%Y%m%d%H%M%S%f}"'
+
+
+def detail_entry(etag, body):
+    """Detail cache payload: the ETag line, then the gzip body."""
+    return (etag or "").encode() + b"\n" + body
+
+
+def split_detail_entry(payload):
+    payload = bytes(payload)
+    end = payload.index(b"\n")
+    return payload[:end].decode() or None, payload[end + 1:]
+
+
+def service_detail_payload(service, cached):
+    if not service:
+        return {
+            "status": "error",
+            "error_code": 100,
+            "message": "Service not found",
+            "data": ""
+        }
+
+    return {
+        "status": "success",
+        "error_code": 0,
+        "message": "Service fetched successfully (cached)" if cached
+                   else "Service fetched successfully",
+        "data": service
+    }
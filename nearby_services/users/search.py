@@ -0,0 +1,303 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Nearby search parameters and queries. The querysets are built here and
+# evaluated by the views, so the sync and async views share them.
+
+import json
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import F, Value
+from django.db.models.functions import Exp
+
+from .functions import DistanceGeography, DWithinGeography, KNNGeography
+from .db_router import CACHE_FILL_DB, read_connection
+from .models import Service
+from .serializers import service_rows
+from .spatial_index import memory_backend_enabled
+
+NEARBY_SORTS = ("distance", "relevance")
+
+
+def _blank(value):
+    return value is None or value == ""
+
+
+def parse_metadata_filter(value):
+    """
+    Metadata containment filter from a JSON object (or its string form),
+    e.g. {"accepts_cards": true, "languages": ["en"]}. Returns None if blank.
+    Raises ValueError with a client-facing message.
+    """
+    if _blank(value):
+        return None
+
+    if isinstance(value, str):
+        if len(value) > settings.METADATA_FILTER_MAX_LENGTH:
+            raise ValueError(f"metadata must be at most {settings.METADATA_FILTER_MAX_LENGTH} characters")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError("metadata must be a JSON object")
+
+    if not isinstance(value, dict) or not value:
+        raise ValueError("metadata must be a non-empty JSON object")
+    return value
+
+
+def filter_metadata(services, metadata):
+    """`metadata @> filter`, answered by the service_metadata_gin_idx index."""
+    if metadata is None:
+        return services
+    return services.filter(metadata__contains=metadata)
+
+
+def parse_nearby_query(params):
+    """
+    Validate nearby search parameters from a query string or a JSON object.
+    Raises ValueError with a client-facing message.
+    """
+    lat = params.get("latitude")
+    lng = params.get("longitude")
+    radius = params.get("radius")
+    limit = params.get("limit")
+    if _blank(limit):
+        limit = params.get("k")
+    category = params.get("category") or ""
+    sort = params.get("sort") or "distance"
+    # Normalised so equivalent name searches share one cache entry
+    q = " ".join(str(params.get("q") or "").lower().split())
+    min_rating = params.get("min_rating")
+
+    if _blank(lat) or _blank(lng):
+        raise ValueError("latitude and longitude are required")
+
+    try:
+        lat = float(lat)
+        lng = float(lng)
+        radius = None if _blank(radius) else float(radius)
+        limit = None if _blank(limit) else int(limit)
+        min_rating = None if _blank(min_rating) else float(min_rating)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid latitude, longitude, radius, limit or min_rating")
+
+    if limit is not None and not 1 <= limit <= settings.NEARBY_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {settings.NEARBY_MAX_LIMIT}")
+
+    metadata = parse_metadata_filter(params.get("metadata"))
+
+    if len(q) > settings.NEARBY_QUERY_MAX_LENGTH:
+        raise ValueError(f"q must be at most {settings.NEARBY_QUERY_MAX_LENGTH} characters")
+
+    if sort not in NEARBY_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(NEARBY_SORTS)}")
+
+    if sort == "relevance":
+        # Ranked results are always a short top list around the caller
+        if limit is None:
+            limit = settings.NEARBY_RELEVANCE_DEFAULT_LIMIT
+        if radius is None:
+            radius = settings.NEARBY_DEFAULT_RADIUS_KM
+
+    # Radius is only optional in top-k mode
+    if radius is None and limit is None:
+        radius = settings.NEARBY_DEFAULT_RADIUS_KM
+
+    return {
+        "lat": lat,
+        "lng": lng,
+        "radius": radius,
+        "limit": limit,
+        "category": str(category),
+        "sort": sort,
+        "min_rating": min_rating,
+        "q": q,
+        "metadata": metadata,
+    }
+
+
+def uses_memory_index(query):
+    """
+    The in-process index (NEARBY_BACKEND = "memory") serves plain searches;
+    name and metadata filters need the database's indexes.
+    """
+    return memory_backend_enabled() and not query["q"] and query["metadata"] is None
+
+
+def uses_cell_cache(query):
+    """
+    Distance-ordered radius searches are answered from cached cells. Top-k
+    searches (`limit`) are not: the KNN query reads only k rows.
+    """
+    return query["radius"] is not None and query["limit"] is None and query["sort"] == "distance"
+
+
+def _match_name(services, q):
+    """
+    Fuzzy and prefix matches of `q` against name (`name %> q`, backed by the
+    service_name_trgm_idx GIN index), with their word similarity.
+    """
+    return services.filter(name__trigram_word_similar=q).annotate(
+        similarity=TrigramWordSimilarity(q, "name")
+    )
+
+
+def candidate_queryset(cell, query):
+    """
+    Every service that can be in range of a caller inside `cell`, up to one
+    row past NEARBY_CELL_MAX_CANDIDATES. Read from the primary, as the result
+    fills the shared cell cache.
+    """
+    center_lat, center_lng = cell.center
+    services = Service.objects.using(CACHE_FILL_DB).filter(
+        DWithinGeography(
+            "location",
+            Point(center_lng, center_lat, srid=4326),
+            cell.reach_km * 1000
+        )
+    )
+
+    if query["category"]:
+        services = services.filter(category=query["category"])
+
+    services = filter_metadata(services, query["metadata"])
+
+    if query["q"]:
+        # Rows keep `similarity` for select_candidates() to rank on
+        services = service_rows(_match_name(services, query["q"]), "similarity")
+    else:
+        services = service_rows(services)
+
+    return services[:settings.NEARBY_CELL_MAX_CANDIDATES + 1]
+
+
+def direct_queryset(query):
+    """
+    Uncached search straight against PostGIS, for top-k searches, a radius
+    wider than the largest cache bucket, cells too dense to cache, or
+    sort=relevance. Rows carry `distance` (and `score` / `similarity`)
+    columns that direct_results() drops.
+    """
+    user_location = Point(query["lng"], query["lat"], srid=4326)
+    services = Service.objects.annotate(
+        distance=Distance("location", user_location)
+    )
+
+    if query["radius"] is not None:
+        services = services.filter(
+            DWithinGeography("location", user_location, query["radius"] * 1000)
+        )
+
+    if query["category"]:
+        services = services.filter(category=query["category"])
+
+    if query["min_rating"] is not None:
+        services = services.filter(rating__gte=query["min_rating"])
+
+    services = filter_metadata(services, query["metadata"])
+
+    if query["q"]:
+        services = _match_name(services, query["q"])
+
+    if query["sort"] == "relevance":
+        # rating x exp(-distance / decay), ranked and cut to the top `limit`
+        # in the query; the radius filter keeps the scored set small
+        decay_m = settings.NEARBY_RELEVANCE_DECAY_KM * 1000
+        services = services.annotate(
+            score=F("rating") * Exp(DistanceGeography("location", user_location) / Value(-decay_m))
+        )
+        extra_fields = ("similarity",) if query["q"] else ()
+        return service_rows(services, "distance", "score", *extra_fields).order_by(
+            "-score", "id"
+        )[:query["limit"]]
+
+    if query["q"]:
+        # Best name match first, nearest first among equally good matches
+        services = service_rows(services, "distance", "similarity").order_by("-similarity", "distance")
+        return services if query["limit"] is None else services[:query["limit"]]
+
+    services = service_rows(services, "distance")
+
+    if query["limit"] is not None:
+        # Top-k mode: let the GiST index walk the k nearest rows via `<->`,
+        # so the exact distance is only computed for those rows
+        return services.order_by(KNNGeography("location", user_location))[:query["limit"]]
+
+    return services.order_by("distance")
+
+
+def direct_results(rows, query):
+    if query["limit"] is not None and query["sort"] == "distance" and not query["q"]:
+        # Re-sort the k nearest on their exact distance
+        rows = sorted(rows, key=itemgetter("distance"))
+
+    for row in rows:
+        row.pop("distance")
+        row.pop("score", None)
+        row.pop("similarity", None)
+    return rows
+
+
+def batch_nearby(queries):
+    """
+    Answer many parsed nearby queries with one statement: a LATERAL join of
+    the services table against a VALUES list of query points. Returns one
+    result list per query, in query order.
+    """
+    if not queries:
+        return []
+
+    connection = read_connection(Service)
+    table = connection.ops.quote_name(Service._meta.db_table)
+    values_sql = ", ".join(
+        ["(%s::int, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s::float8, %s::text, %s::int, %s::float8, %s::jsonb)"]
+        * len(queries)
+    )
+    params = []
+    for index, query in enumerate(queries):
+        radius_m = None if query["radius"] is None else query["radius"] * 1000
+        params += [
+            index, query["lng"], query["lat"], radius_m, query["category"], query["limit"], query["min_rating"],
+            None if query["metadata"] is None else json.dumps(query["metadata"])
+        ]
+
+    sql = f"""
+        SELECT q.idx, svc.id, svc.name, svc.category, svc.rating, svc.metadata, svc.lat, svc.lng
+        FROM (VALUES {values_sql}) AS q(idx, point, radius_m, category, lim, min_rating, metadata)
+        CROSS JOIN LATERAL (
+            SELECT s.id, s.name, s.category, s.rating, s.metadata,
+                   ST_Y(s.location) AS lat, ST_X(s.location) AS lng,
+                   s.location::geography <-> q.point AS distance
+            FROM {table} AS s
+            WHERE (q.radius_m IS NULL OR ST_DWithin(s.location::geography, q.point, q.radius_m))
+              AND (q.category = '' OR s.category = q.category)
+              AND (q.min_rating IS NULL OR s.rating >= q.min_rating)
+              AND (q.metadata IS NULL OR s.metadata @> q.metadata)
+            ORDER BY distance
+            LIMIT q.lim
+        ) AS svc
+        ORDER BY q.idx, svc.distance
+    """
+
+    results = [[] for _ in queries]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for index, *row in cursor.fetchall():
+            # Django reads jsonb as text and leaves decoding to JSONField
+            metadata = json.loads(row[4]) if isinstance(row[4], str) else row[4]
+            results[index].append({
+                "id": row[0],
+                "name": row[1],
+                "category": row[2],
+                "rating": row[3],
+                "metadata": metadata,
+                "lat": row[5],
+                "lng": row[6],
+            })
+    return results
@@ -6,6 +6,7 @@ __lastupdateddate__ = "16-02-2026"
 from rest_framework import serializers
 from .models import User, Service
 from django.contrib.gis.geos import Point
+from .functions import X, Y
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -58,3 +59,28 @@ class ServiceSerializer(serializers.ModelSerializer):
         validated_data['location'] = Point(lng, lat)
 
         return Service.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        lat = validated_data.pop('latitude')
+        lng = validated_data.pop('longitude')
+
+        validated_data['location'] = Point(lng, lat)
+
+        return super().update(instance, validated_data)
+
+
+# Read fast path with the same output keys as ServiceSerializer.
+SERVICE_READ_FIELDS = ('id', 'name', 'category', 'rating', 'metadata', 'lat', 'lng')
+
+
+def service_rows(queryset, *extra_fields):
+    """
+    Service rows as plain dicts shaped like ServiceSerializer output.
+
+    Coordinates are selected with ST_Y/ST_X, so rows are never hydrated into
+    model instances with a GEOS Point and DRF's per-field machinery is skipped.
+    """
+    return queryset.annotate(
+        lat=Y('location'),
+        lng=X('location'),
+    ).values(*SERVICE_READ_FIELDS, *extra_fields)
@@ -0,0 +1,19 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Service
+from .spatial_index import publish_changes
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance, **kwargs):
+    # Publish after commit so other workers re-read the committed row
+    service_id = instance.pk
+    transaction.on_commit(lambda: publish_changes([service_id]))
@@ -0,0 +1,272 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# In-process spatial index of every Service, used as the nearby backend when
+# NEARBY_BACKEND = "memory".
+#
+# Coordinates, ratings and category codes live in packed NumPy arrays; radius
+# and k-NN searches are a vectorised bounding-box prefilter followed by an
+# exact haversine refinement. Each worker builds its own copy when it starts
+# (warm_service_index, called from config.wsgi / config.asgi) and keeps it
+# current from a change feed in the shared cache: every write appends the
+# service id under an increasing sequence number (see publish_changes), and
+# workers replay the ids they have not seen yet.
+
+import logging
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .geo import EARTH_RADIUS_KM
+from .models import Service
+from .serializers import service_rows
+
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for the memory backend
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = "service_index:sequence"
+REBUILD_KEY = "service_index:rebuild"
+
+
+def _change_key(sequence):
+    return f"service_index:change:{sequence}"
+
+
+def memory_backend_enabled():
+    return settings.NEARBY_BACKEND == "memory"
+
+
+def publish_changes(service_ids):
+    """Tell every worker's index that these services were written or deleted."""
+    if not memory_backend_enabled() or not service_ids:
+        return
+
+    # Replaying a huge change set costs more than rebuilding
+    if len(service_ids) > settings.SERVICE_INDEX_MAX_CHANGES:
+        cache.set(REBUILD_KEY, uuid.uuid4().hex, timeout=None)
+        return
+
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    for service_id in service_ids:
+        sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(_change_key(sequence), service_id, timeout=settings.SERVICE_INDEX_CHANGE_TTL)
+
+    get_service_index().mark_stale()
+
+
+class ServiceIndex:
+    def __init__(self):
+        if np is None:
+            raise ImproperlyConfigured("NEARBY_BACKEND = 'memory' requires numpy")
+
+        self._lock = threading.RLock()
+        self._built = False
+        self._sequence = 0
+        self._rebuild_token = None
+        self._next_sync = 0.0
+
+    # -- maintenance -------------------------------------------------------
+
+    def mark_stale(self):
+        self._next_sync = 0.0
+
+    def _reset(self, capacity):
+        self._size = 0
+        self._lat = np.zeros(capacity, dtype=np.float64)     # radians
+        self._lng = np.zeros(capacity, dtype=np.float64)     # radians
+        self._rating = np.zeros(capacity, dtype=np.float32)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._rows = [None] * capacity
+        self._positions = {}
+        self._category_codes = {}
+
+    def _grow(self):
+        capacity = max(1024, 2 * len(self._rows))
+        for name in ("_lat", "_lng", "_rating", "_category", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        self._rows.extend([None] * (capacity - len(self._rows)))
+
+    def _upsert(self, row):
+        position = self._positions.get(row["id"])
+        if position is None:
+            if self._size == len(self._rows):
+                self._grow()
+            position = self._size
+            self._size += 1
+            self._positions[row["id"]] = position
+
+        code = self._category_codes.setdefault(row["category"], len(self._category_codes))
+        self._lat[position] = math.radians(row["lat"])
+        self._lng[position] = math.radians(row["lng"])
+        self._rating[position] = row["rating"]
+        self._category[position] = code
+        self._alive[position] = True
+        self._rows[position] = row
+
+    def _remove(self, service_id):
+        position = self._positions.pop(service_id, None)
+        if position is not None:
+            self._alive[position] = False
+            self._rows[position] = None
+
+    def _build(self, sequence, rebuild_token):
+        # Read from the primary: a lagging replica could miss the changes the
+        # feed has already been replayed past
+        services = Service.objects.using("default")
+        self._reset(max(1024, int(services.count() * 1.25)))
+        for row in service_rows(services.order_by("id")).iterator(chunk_size=5000):
+            self._upsert(row)
+
+        self._sequence = sequence
+        self._rebuild_token = rebuild_token
+        self._built = True
+
+    def _refresh(self, service_ids):
+        services = Service.objects.using("default").filter(id__in=service_ids)
+        rows = {row["id"]: row for row in service_rows(services)}
+        for service_id in service_ids:
+            if service_id in rows:
+                self._upsert(rows[service_id])
+            else:
+                self._remove(service_id)
+
+    def sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+
+            state = cache.get_many([SEQUENCE_KEY, REBUILD_KEY])
+            sequence = state.get(SEQUENCE_KEY, 0)
+            rebuild_token = state.get(REBUILD_KEY)
+
+            if not self._built or rebuild_token != self._rebuild_token or sequence < self._sequence:
+                self._build(sequence, rebuild_token)
+
+            elif sequence > self._sequence:
+                keys = [_change_key(n) for n in range(self._sequence + 1, sequence + 1)]
+                changes = cache.get_many(keys) if len(keys) <= settings.SERVICE_INDEX_MAX_CHANGES else {}
+
+                # A missing entry has expired (or is being published right
+                # now); either way the feed has a gap, so start over
+                if len(changes) < len(keys):
+                    self._build(sequence, rebuild_token)
+                else:
+                    self._refresh(set(changes.values()))
+                    self._sequence = sequence
+
+            self._next_sync = time.monotonic() + settings.SERVICE_INDEX_SYNC_INTERVAL
+
+    # -- queries -----------------------------------------------------------
+
+    def search(self, lat, lng, radius_km=None, category="", limit=None, min_rating=None, sort="distance"):
+        """
+        Services within `radius_km` (if given) of (lat, lng), nearest first
+        (or best NEARBY_RELEVANCE_DECAY_KM-weighted rating first for
+        sort="relevance"), truncated to `limit` (if given). Rows match
+        service_rows() output.
+        """
+        self.sync()
+
+        with self._lock:
+            size = self._size
+            mask = self._alive[:size].copy()
+            lat_arr, lng_arr, rows = self._lat[:size], self._lng[:size], self._rows
+
+            if category:
+                code = self._category_codes.get(category)
+                if code is None:
+                    return []
+                mask &= self._category[:size] == code
+
+            if min_rating is not None:
+                mask &= self._rating[:size] >= min_rating
+            rating_arr = self._rating[:size]
+
+        lat0, lng0 = math.radians(lat), math.radians(lng)
+
+        if radius_km is not None:
+            # Bounding-box prefilter before the exact distance
+            d_lat = radius_km / EARTH_RADIUS_KM
+            mask &= np.abs(lat_arr - lat0) <= d_lat
+
+            # Longitude span of the circle; none if it contains a pole
+            sin_span = math.sin(min(d_lat, math.pi / 2)) / max(math.cos(lat0), 1e-12)
+            if abs(lat0) + d_lat < math.pi / 2 and sin_span < 1:
+                d_lng = math.asin(sin_span)
+                mask &= np.abs((lng_arr - lng0 + math.pi) % (2 * math.pi) - math.pi) <= d_lng
+
+        candidates = np.flatnonzero(mask)
+        c_lat, c_lng = lat_arr[candidates], lng_arr[candidates]
+        a = (
+            np.sin((c_lat - lat0) / 2) ** 2
+            + math.cos(lat0) * np.cos(c_lat) * np.sin((c_lng - lng0) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+        if radius_km is not None:
+            within = distances <= radius_km
+            candidates, distances = candidates[within], distances[within]
+
+        if sort == "relevance":
+            keys = -(rating_arr[candidates] * np.exp(-distances / settings.NEARBY_RELEVANCE_DECAY_KM))
+        else:
+            keys = distances
+
+        if limit is not None and len(candidates) > limit:
+            best = np.argpartition(keys, limit - 1)[:limit]
+            candidates, keys = candidates[best], keys[best]
+
+        order = np.argsort(keys, kind="stable")
+        # A row can be removed by a concurrent sync after the snapshot
+        return [rows[i] for i in candidates[order] if rows[i] is not None]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_service_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ServiceIndex()
+    return _index
+
+
+def warm_service_index():
+    """
+    Build this process's index before it serves requests, so the full-table
+    read does not land on the first nearby request. A missing numpy fails
+    the worker at startup; a failed build is retried on first use.
+    """
+    if not memory_backend_enabled():
+        return
+
+    index = get_service_index()
+    try:
+        index.sync()
+    except Exception:
+        logger.exception("Service index warm-up failed; building it on first use")
+    finally:
+        # Opened outside any request, so no request_finished closes it
+        connections.close_all()
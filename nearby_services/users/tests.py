@@ -1,3 +1,654 @@
-from django.test import TestCase
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
 
-# Create your tests here.
+# Unit tests for the helpers behind the nearby cache (geohash cells, cell
+# invalidation, packed candidates), the in-process spatial index, keyset
+# pagination, import parsing, partition bounds, replica routing and the
+# Redis-backed pipelines and throttle. None of them touch the database; the Redis-backed ones run
+# against fakeredis (pip install "fakeredis[lua]") and are skipped without it.
+
+import base64
+import io
+import json
+import math
+import operator
+import random
+from datetime import datetime, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from django.views import View
+
+from . import audit, db_router, geo, partitions, throttles
+from .caching import (
+    RADIUS_BUCKETS_KM, NearbyCell, affected_cells, bucket_precision, is_oversized,
+    pack_candidates, select_candidates
+)
+from .ingest import IngestError, _feature_record, parse_records
+from .pagination import InvalidCursor, _after, decode_cursor, encode_cursor, parse_page_size
+from .spatial_index import ServiceIndex, np
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+# Service locations: mid-latitude cities, the equator, the antimeridian and
+# a high latitude, where cells are narrowest
+POINTS = [
+    (18.5204, 73.8567),
+    (40.7128, -74.0060),
+    (0.0, 0.0),
+    (-33.8688, 151.2093),
+    (10.0, 179.999),
+    (70.0, 25.0),
+]
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_known_geohashes(self):
+        cases = [
+            (57.64911, 10.40744, 11, "u4pruydqqvj"),
+            (48.8566, 2.3522, 6, "u09tvw"),
+            (40.7128, -74.0060, 6, "dr5reg"),
+            (-33.8688, 151.2093, 6, "r3gx2f"),
+            (0.0, 0.0, 5, "s0000"),
+        ]
+        for lat, lng, precision, expected in cases:
+            with self.subTest(lat=lat, lng=lng, precision=precision):
+                lat_idx, lng_idx = geo.cell_index(lat, lng, precision)
+                self.assertEqual(geo.cell_geohash(lat_idx, lng_idx, precision), expected)
+
+    def test_cell_contains_its_points(self):
+        for lat, lng in POINTS:
+            for precision in (5, 6):
+                with self.subTest(lat=lat, lng=lng, precision=precision):
+                    lat_idx, lng_idx = geo.cell_index(lat, lng, precision)
+                    south, west, north, east = geo.cell_bounds(lat_idx, lng_idx, precision)
+                    self.assertTrue(south <= lat < north)
+                    self.assertTrue(west <= lng < east)
+                    self.assertEqual(
+                        geo.cell_index(*geo.cell_center(lat_idx, lng_idx, precision), precision),
+                        (lat_idx, lng_idx)
+                    )
+
+    def test_cells_around_covers_the_circle(self):
+        rng = random.Random(1)
+        for lat, lng in POINTS:
+            for precision, distance_km in ((6, 3.0), (5, 15.0)):
+                cells = set(geo.cells_around(lat, lng, distance_km, precision))
+                for _ in range(200):
+                    point = _point_within(rng, lat, lng, distance_km)
+                    with self.subTest(center=(lat, lng), point=point, precision=precision):
+                        self.assertIn(geo.cell_index(*point, precision), cells)
+
+
+class NearbyCellTests(SimpleTestCase):
+
+    def test_cell_reach_holds_every_result(self):
+        # Any service within `radius` of a caller must be in the candidate
+        # set of the caller's cell, or cached results would miss it
+        rng = random.Random(2)
+        for lat, lng in POINTS:
+            for bucket in RADIUS_BUCKETS_KM:
+                for _ in range(100):
+                    caller = _point_within(rng, lat, lng, 20.0)
+                    radius = rng.uniform(0.1, bucket)
+                    service = _point_within(rng, *caller, radius)
+                    cell = NearbyCell.for_search(*caller, radius)
+                    with self.subTest(caller=caller, radius=radius, service=service):
+                        self.assertLessEqual(geo.haversine_km(*cell.center, *service), cell.reach_km)
+
+    def test_wide_searches_are_not_cached(self):
+        self.assertIsNone(NearbyCell.for_search(18.52, 73.85, RADIUS_BUCKETS_KM[-1] + 0.1))
+
+    def test_cache_key_ignores_metadata_key_order(self):
+        cell = NearbyCell.for_search(18.52, 73.85, 5)
+        self.assertEqual(
+            cell.cache_key("cafe", "v1", "", {"a": 1, "b": [2]}),
+            cell.cache_key("cafe", "v1", "", {"b": [2], "a": 1})
+        )
+        self.assertNotEqual(
+            cell.cache_key("cafe", "v1", "", {"a": 1}),
+            cell.cache_key("cafe", "v1", "", None)
+        )
+
+
+class AffectedCellsTests(SimpleTestCase):
+
+    def test_every_cell_in_reach_is_invalidated(self):
+        for lat, lng in POINTS:
+            cells = affected_cells([(lat, lng)])
+            for bucket in RADIUS_BUCKETS_KM:
+                precision = bucket_precision(bucket)
+                # Wider than any reach, so every cell that can hold the point is checked
+                for index in geo.cells_around(lat, lng, 2 * bucket + 10, precision):
+                    cell = NearbyCell(bucket, *index)
+                    if geo.haversine_km(*cell.center, lat, lng) <= cell.reach_km:
+                        with self.subTest(point=(lat, lng), bucket=bucket, cell=cell.geohash):
+                            self.assertIn(cell, cells)
+
+    def test_invalidation_stays_local(self):
+        # Grouping points by source cell may over-invalidate by up to that
+        # cell's diameter, but never more
+        for lat, lng in POINTS:
+            for cell in affected_cells([(lat, lng)]):
+                precision = cell.precision
+                source_half_diagonal = geo.cell_half_diagonal_km(*geo.cell_index(lat, lng, precision), precision)
+                with self.subTest(point=(lat, lng), cell=cell.geohash):
+                    self.assertLessEqual(
+                        geo.haversine_km(*cell.center, lat, lng),
+                        cell.reach_km + 2 * source_half_diagonal
+                    )
+
+    def test_many_points_match_single_points(self):
+        points = [(18.5204, 73.8567), (18.5210, 73.8570), (18.60, 73.70)]
+        expected = set().union(*(affected_cells([point]) for point in points))
+        self.assertEqual(affected_cells(points), expected)
+
+
+class PackedCandidatesTests(SimpleTestCase):
+
+    ROWS = [
+        {"id": 1, "name": "Near", "category": "cafe", "rating": 4.5, "lat": 18.5204, "lng": 73.8567},
+        {"id": 2, "name": "Mid", "category": "cafe", "rating": 3.0, "lat": 18.5300, "lng": 73.8567},
+        {"id": 3, "name": "Far", "category": "cafe", "rating": 5.0, "lat": 18.6000, "lng": 73.8567},
+        {"id": 4, "name": "Out of range", "category": "cafe", "rating": 5.0, "lat": 19.5, "lng": 73.8567},
+    ]
+
+    def _select(self, rows, **kwargs):
+        packed = pack_candidates([dict(row) for row in rows])
+        return json.loads(select_candidates(packed, 18.5204, 73.8567, 10, **kwargs))
+
+    def test_round_trip_sorted_by_distance(self):
+        self.assertEqual(self._select(reversed(self.ROWS)), self.ROWS[:3])
+
+    def test_limit_and_min_rating(self):
+        self.assertEqual(self._select(self.ROWS, limit=2), self.ROWS[:2])
+        self.assertEqual(self._select(self.ROWS, min_rating=4.0), [self.ROWS[0], self.ROWS[2]])
+
+    def test_similarity_ranks_first(self):
+        rows = [dict(row, similarity=similarity) for row, similarity in zip(self.ROWS, (0.2, 0.9, 0.9, 1.0))]
+        self.assertEqual(
+            [row["id"] for row in self._select(rows)],
+            [2, 3, 1]
+        )
+
+    def test_reads_from_memoryview(self):
+        packed = pack_candidates([dict(row) for row in self.ROWS])
+        self.assertEqual(
+            select_candidates(memoryview(packed), 18.5204, 73.8567, 10),
+            select_candidates(packed, 18.5204, 73.8567, 10)
+        )
+
+    def test_empty(self):
+        packed = pack_candidates([])
+        self.assertFalse(is_oversized(packed))
+        self.assertEqual(select_candidates(packed, 18.5204, 73.8567, 10), b"[]")
+
+    @override_settings(NEARBY_CELL_MAX_CANDIDATES=3)
+    def test_oversized(self):
+        self.assertTrue(is_oversized(pack_candidates([dict(row) for row in self.ROWS])))
+        self.assertFalse(is_oversized(pack_candidates([dict(row) for row in self.ROWS[:3]])))
+
+
+@skipUnless(np, "needs numpy")
+class ServiceIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = random.Random(12)
+        self.rows = []
+        # Around every test location and near the pole, where the search
+        # has to give up its longitude prefilter
+        for lat, lng in POINTS + [(89.6, 0.0)]:
+            for _ in range(150):
+                point_lat, point_lng = _point_within(rng, lat, lng, 30.0)
+                self.rows.append({
+                    "id": len(self.rows) + 1,
+                    "category": rng.choice(["plumber", "doctor", "grocery"]),
+                    "lat": point_lat,
+                    "lng": point_lng,
+                    "rating": rng.randint(2, 10) / 2,
+                })
+
+        # A small capacity makes the index grow while it is filled
+        self.index = ServiceIndex()
+        self.index._reset(16)
+        for row in self.rows:
+            self.index._upsert(row)
+        self.index._built = True
+        self.index._next_sync = float("inf")
+
+    def _brute_force(self, lat, lng, radius_km=None, category="", limit=None, min_rating=None, sort="distance"):
+        matches = []
+        for row in self.rows:
+            distance = geo.haversine_km(lat, lng, row["lat"], row["lng"])
+            if radius_km is not None and distance > radius_km:
+                continue
+            if category and row["category"] != category:
+                continue
+            if min_rating is not None and row["rating"] < min_rating:
+                continue
+            if sort == "relevance":
+                key = -row["rating"] * math.exp(-distance / 2.0)
+            else:
+                key = distance
+            matches.append((key, row["id"]))
+        return [row_id for _, row_id in sorted(matches)][:limit]
+
+    def _ids(self, *args, **kwargs):
+        return [row["id"] for row in self.index.search(*args, **kwargs)]
+
+    def test_matches_brute_force_haversine(self):
+        rng = random.Random(21)
+        searches = [
+            {"radius_km": 5.0},
+            {"radius_km": 25.0, "category": "doctor"},
+            {"radius_km": 40.0, "min_rating": 3.5},
+            {"limit": 10},
+            {"radius_km": 15.0, "limit": 5, "category": "grocery"},
+        ]
+        for lat, lng in POINTS + [(89.8, 120.0)]:
+            caller = _point_within(rng, lat, lng, 10.0)
+            for search in searches:
+                with self.subTest(caller=caller, **search):
+                    self.assertEqual(self._ids(*caller, **search), self._brute_force(*caller, **search))
+
+    @override_settings(NEARBY_RELEVANCE_DECAY_KM=2.0)
+    def test_relevance_sort(self):
+        for lat, lng in POINTS:
+            with self.subTest(lat=lat, lng=lng):
+                self.assertEqual(
+                    self._ids(lat, lng, radius_km=10.0, limit=20, sort="relevance"),
+                    self._brute_force(lat, lng, radius_km=10.0, limit=20, sort="relevance"),
+                )
+
+    def test_updates_and_removals(self):
+        lat, lng = POINTS[0]
+        moved = dict(self.rows[0], lat=lat, lng=lng)
+        self.index._upsert(moved)
+        self.assertEqual(self._ids(lat, lng, limit=1), [moved["id"]])
+
+        self.index._remove(moved["id"])
+        self.assertNotIn(moved["id"], self._ids(lat, lng, radius_km=50.0))
+        self.assertEqual(self._ids(lat, lng, category="no such category"), [])
+
+
+class KeysetTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        values = ["2026-10-18T10:00:00+00:00", 42]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_invalid_cursors(self):
+        not_a_list = base64.urlsafe_b64encode(b'{"id": 1}').decode()
+        not_utf8 = base64.urlsafe_b64encode(b"\xff\xfe").decode()
+        for token in ("!!!", "abc", not_a_list, not_utf8):
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(token)
+
+    def test_after_follows_the_ordering(self):
+        rows = [
+            {"timestamp": timestamp, "id": row_id, "rating": rating}
+            for row_id, (timestamp, rating) in enumerate(
+                [(1, 3), (2, 5), (2, 4), (2, 5), (3, 1), (3, 1), (5, 2)], start=1
+            )
+        ]
+        for ordering in (["id"], ["-timestamp", "-id"], ["timestamp", "-rating", "id"]):
+            ordered = _sorted(rows, ordering)
+            for position, row in enumerate(ordered):
+                values = [row[name.lstrip("-")] for name in ordering]
+                with self.subTest(ordering=ordering, cursor=values):
+                    after = [other for other in ordered if _matches(_after(ordering, values), other)]
+                    self.assertEqual(after, ordered[position + 1:])
+
+    def test_after_bounds_the_leading_key(self):
+        # Without a plain range on the first column Postgres cannot use the
+        # index to skip the rows before the cursor
+        self.assertIn(("timestamp__lte", 7), _after(["-timestamp", "-id"], [7, 3]).children)
+        self.assertIn(("timestamp__gte", 7), _after(["timestamp", "id"], [7, 3]).children)
+
+    def test_page_size(self):
+        self.assertEqual(parse_page_size(None, 100, 1000), 100)
+        self.assertEqual(parse_page_size("25", 100, 1000), 25)
+        for value in ("0", "1001", "ten"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_page_size(value, 100, 1000)
+
+
+class ImportParsingTests(SimpleTestCase):
+
+    def test_feature_record(self):
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [73.8567, 18.5204, 560]},
+            "properties": {"name": "Clinic", "category": "doctor"},
+        }
+        self.assertEqual(
+            _feature_record(feature),
+            {"name": "Clinic", "category": "doctor", "longitude": 73.8567, "latitude": 18.5204},
+        )
+        # Without a Point the serializer reports the missing coordinates
+        self.assertEqual(_feature_record({"properties": {"name": "Clinic"}, "geometry": None}), {"name": "Clinic"})
+
+    def test_malformed_features(self):
+        features = [
+            [73.8, 18.5],
+            "Feature",
+            {"properties": ["name"], "geometry": None},
+            {"properties": {}, "geometry": "POINT(73.8 18.5)"},
+            {"properties": {}, "geometry": {"type": "Point", "coordinates": [73.8]}},
+            {"properties": {}, "geometry": {"type": "Point", "coordinates": ["73.8", "18.5"]}},
+            {"properties": {}, "geometry": {"type": "Point", "coordinates": [True, 18.5]}},
+            {"properties": {}, "geometry": {"type": "Point", "coordinates": {"lng": 73.8, "lat": 18.5}}},
+        ]
+        for feature in features:
+            with self.subTest(feature=feature):
+                with self.assertRaises(ValueError):
+                    _feature_record(feature)
+
+    def test_geojson_reports_every_malformed_feature(self):
+        point = {"type": "Point", "coordinates": [73.8, 18.5]}
+        collection = {"type": "FeatureCollection", "features": [
+            {"properties": {"name": "a"}, "geometry": point},
+            "not a feature",
+            {"properties": {"name": "c"}, "geometry": point},
+            {"properties": {}, "geometry": {"type": "Point", "coordinates": []}},
+        ]}
+        with self.assertRaises(IngestError) as raised:
+            list(parse_records(io.StringIO(json.dumps(collection)), "geojson"))
+        self.assertEqual([error["record"] for error in raised.exception.errors], [1, 3])
+
+    def test_geojson_needs_a_feature_collection(self):
+        for document in ([], {"type": "Feature"}, {"features": {}}):
+            with self.subTest(document=document):
+                with self.assertRaises(IngestError):
+                    list(parse_records(io.StringIO(json.dumps(document)), "geojson"))
+
+    def test_csv_metadata(self):
+        stream = io.StringIO(
+            "name,category,latitude,longitude,metadata\r\n"
+            'Clinic,doctor,18.5,73.8,"{""open"": true}"\r\n'
+            "Store,grocery,18.6,73.9,\r\n"
+        )
+        self.assertEqual(list(parse_records(stream, "csv")), [
+            {"name": "Clinic", "category": "doctor", "latitude": "18.5", "longitude": "73.8",
+             "metadata": {"open": True}},
+            {"name": "Store", "category": "grocery", "latitude": "18.6", "longitude": "73.9"},
+        ])
+
+    def test_ndjson_skips_blank_lines(self):
+        stream = io.StringIO('{"name": "a"}\n\n  \n{"name": "b"}\n')
+        self.assertEqual(list(parse_records(stream, "ndjson")), [{"name": "a"}, {"name": "b"}])
+
+
+class PartitionBoundsTests(SimpleTestCase):
+
+    def test_add_months(self):
+        cases = [
+            (datetime(2026, 10, 18, 9, 30, tzinfo=dt_timezone.utc), 0, datetime(2026, 10, 1)),
+            (datetime(2026, 10, 1, tzinfo=dt_timezone.utc), 3, datetime(2027, 1, 1)),
+            (datetime(2026, 1, 31, tzinfo=dt_timezone.utc), 1, datetime(2026, 2, 1)),
+            (datetime(2026, 3, 15, tzinfo=dt_timezone.utc), -3, datetime(2025, 12, 1)),
+            (datetime(2026, 10, 18, tzinfo=dt_timezone.utc), -24, datetime(2024, 10, 1)),
+        ]
+        for start, months, expected in cases:
+            with self.subTest(start=start, months=months):
+                self.assertEqual(partitions.add_months(start, months), expected.replace(tzinfo=dt_timezone.utc))
+
+    def test_partition_start(self):
+        when = datetime(2026, 11, 18, 9, 30, tzinfo=dt_timezone.utc)
+        cases = [(1, datetime(2026, 11, 1)), (3, datetime(2026, 10, 1)), (6, datetime(2026, 7, 1)),
+                 (12, datetime(2026, 1, 1))]
+        for months, expected in cases:
+            with self.subTest(months=months):
+                self.assertEqual(partitions.partition_start(when, months), expected.replace(tzinfo=dt_timezone.utc))
+
+    def test_partitions_tile_the_calendar(self):
+        # Every month falls in exactly one partition, so consecutive
+        # partitions never overlap or leave a gap
+        for months in (1, 2, 3, 4, 6, 12):
+            start = partitions.partition_start(datetime(2024, 1, 1, tzinfo=dt_timezone.utc), months)
+            for _ in range(30):
+                end = partitions.add_months(start, months)
+                with self.subTest(months=months, start=start):
+                    self.assertEqual(partitions.partition_start(end - (end - start) / 2, months), start)
+                    self.assertEqual(partitions.partition_start(end, months), end)
+                start = end
+
+    def test_expired_partitions(self):
+        cursor = mock.Mock()
+        cursor.fetchall.return_value = [
+            ("users_activitylog_p202609", "FOR VALUES FROM ('2026-09-01 00:00:00+00') TO ('2026-10-01 00:00:00+00')"),
+            ("users_activitylog_default", "DEFAULT"),
+            ("users_activitylog_p202608", "FOR VALUES FROM ('2026-08-01 00:00:00+00') TO ('2026-09-01 00:00:00+00')"),
+        ]
+        cutoff = datetime(2026, 10, 1, tzinfo=dt_timezone.utc)
+        self.assertEqual(
+            partitions.expired_partitions(cursor, cutoff),
+            ["users_activitylog_p202608", "users_activitylog_p202609"],
+        )
+        self.assertEqual(partitions.expired_partitions(cursor, partitions.add_months(cutoff, -1)),
+                         ["users_activitylog_p202608"])
+
+
+class _WriteView(View):
+    pass
+
+
+class _ReadOnlyPostView(View):
+    replica_reads = True
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def _read_db(self, method, view_class, write=False):
+        """Database a read goes to while `view_class` handles a `method` request."""
+        router = db_router.PrimaryReplicaRouter()
+        seen = []
+
+        def get_response(request):
+            # What the handler does around the middleware
+            middleware.process_view(request, view_class.as_view(), (), {})
+            if write:
+                router.db_for_write(None)
+            seen.append(router.db_for_read(None))
+            return HttpResponse()
+
+        middleware = db_router.ReplicaRoutingMiddleware(get_response)
+        middleware(getattr(RequestFactory(), method)("/"))
+        return seen[0]
+
+    def test_reads_follow_the_method(self):
+        self.assertEqual(self._read_db("get", _WriteView), "replica_0")
+        self.assertEqual(self._read_db("post", _WriteView), "default")
+
+    def test_read_only_post_views_read_from_replicas(self):
+        self.assertEqual(self._read_db("post", _ReadOnlyPostView), "replica_0")
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        self.assertEqual(self._read_db("post", _ReadOnlyPostView, write=True), "default")
+
+    def test_routing_is_reset_after_the_request(self):
+        self._read_db("post", _WriteView)
+        self.assertEqual(db_router.PrimaryReplicaRouter().db_for_read(None), "replica_0")
+
+
+@skipUnless(fakeredis, "needs fakeredis[lua]")
+@override_settings(ACTIVITY_LOG_BATCH_SIZE=2)
+class ActivityLogFlushTests(SimpleTestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.queue_key = cache.make_key(audit.QUEUE_KEY)
+        self.lock_key = cache.make_key(audit.FLUSH_LOCK_KEY)
+        for n in range(5):
+            self.redis.rpush(self.queue_key, json.dumps(_activity_entry(n)))
+        self.inserted = []
+
+        patcher = mock.patch.object(audit, "_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _insert(self, entries):
+        self.inserted.extend(entry.details["n"] for entry in entries)
+
+    def test_drains_the_queue_in_batches(self):
+        with mock.patch.object(audit, "_insert", side_effect=self._insert) as insert:
+            self.assertEqual(audit.flush_activity_log(), 5)
+
+        self.assertEqual(self.inserted, [0, 1, 2, 3, 4])
+        self.assertEqual(insert.call_count, 3)
+        self.assertEqual(self.redis.llen(self.queue_key), 0)
+        self.assertIsNone(self.redis.get(self.lock_key))
+
+    def test_database_errors_keep_the_batch(self):
+        with mock.patch.object(audit, "_insert", side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                audit.flush_activity_log()
+
+        self.assertEqual(self.redis.llen(self.queue_key), 5)
+        self.assertIsNone(self.redis.get(self.lock_key))
+
+    def test_only_one_flusher_at_a_time(self):
+        self.redis.set(self.lock_key, "other-flusher")
+        with mock.patch.object(audit, "_insert", side_effect=self._insert):
+            self.assertEqual(audit.flush_activity_log(), 0)
+        self.assertEqual(self.inserted, [])
+
+    def test_flusher_that_lost_the_lock_leaves_the_queue(self):
+        # The lock expires during the insert and another flusher takes it
+        def slow_insert(entries):
+            self._insert(entries)
+            self.redis.set(self.lock_key, "other-flusher")
+
+        with mock.patch.object(audit, "_insert", side_effect=slow_insert):
+            self.assertEqual(audit.flush_activity_log(), 0)
+
+        self.assertEqual(self.redis.llen(self.queue_key), 5)
+        self.assertEqual(self.redis.get(self.lock_key), b"other-flusher")
+
+    def test_overlapping_flushes_lose_nothing(self):
+        # The first flusher's lock expires during its first insert and a
+        # second flusher drains the whole queue meanwhile
+        def insert(entries):
+            self._insert(entries)
+            if len(self.inserted) == len(entries):
+                self.redis.delete(self.lock_key)
+                self.assertEqual(audit.flush_activity_log(), 5)
+
+        with mock.patch.object(audit, "_insert", side_effect=insert):
+            audit.flush_activity_log()
+
+        self.assertEqual(sorted(set(self.inserted)), [0, 1, 2, 3, 4])
+        self.assertEqual(self.redis.llen(self.queue_key), 0)
+        self.assertIsNone(self.redis.get(self.lock_key))
+
+
+@skipUnless(fakeredis, "needs fakeredis[lua]")
+class TokenBucketThrottleTests(SimpleTestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        script = self.redis.register_script(throttles.TOKEN_BUCKET_SCRIPT)
+        # The script reads the Redis clock (TIME), which fakeredis takes from
+        # time.time()
+        self.now = 1_800_000_000.0
+        for patcher in (
+            mock.patch.object(throttles, "_token_bucket_script", return_value=script),
+            mock.patch("time.time", side_effect=lambda: self.now),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _allowed(self, count, user_id=1, role="user"):
+        request = SimpleNamespace(user=SimpleNamespace(id=user_id, role=role, is_authenticated=True))
+        self.throttle = throttles.RoleBasedUserThrottle()
+        return sum(self.throttle.allow_request(request, None) for _ in range(count))
+
+    def test_allows_a_burst_of_the_rate_then_blocks(self):
+        self.assertEqual(self._allowed(200), 200)
+        self.assertEqual(self._allowed(5), 0)
+        self.assertAlmostEqual(self.throttle.wait(), 60 / 200)
+
+    def test_refills_at_the_rate(self):
+        self._allowed(200)
+        self.now += 3
+        self.assertEqual(self._allowed(20), 10)
+
+        # Never more than a full bucket
+        self.assertEqual(self._allowed(10, user_id=2), 10)
+        self.now += 30
+        self.assertEqual(self._allowed(250, user_id=2), 200)
+
+    def test_rate_follows_the_role(self):
+        self.assertEqual(self._allowed(600, role="admin"), 500)
+        self.assertEqual(self._allowed(600, user_id=2, role="staff"), 500)
+        self.assertEqual(self._allowed(600, user_id=3), 200)
+
+    def test_buckets_are_per_user(self):
+        self._allowed(200)
+        self.assertEqual(self._allowed(1, user_id=2), 1)
+        self.assertEqual(self._allowed(1), 0)
+
+
+def _activity_entry(n):
+    return {
+        "performed_by_id": 1,
+        "target_user_id": None,
+        "action": "create_user",
+        "details": {"n": n},
+        "timestamp": timezone.now().isoformat(),
+    }
+
+
+def _point_within(rng, lat, lng, distance_km):
+    """A random point at most `distance_km` from (lat, lng)."""
+    while True:
+        d_lat = rng.uniform(-1, 1) * distance_km / geo.KM_PER_DEGREE
+        d_lng = rng.uniform(-1, 1) * distance_km / geo.KM_PER_DEGREE / max(0.01, math.cos(math.radians(lat)))
+        point = (lat + d_lat, (lng + d_lng + 180.0) % 360.0 - 180.0)
+        if geo.haversine_km(lat, lng, *point) <= distance_km:
+            return point
+
+
+_LOOKUPS = {
+    "exact": operator.eq,
+    "lt": operator.lt,
+    "gt": operator.gt,
+    "lte": operator.le,
+    "gte": operator.ge,
+}
+
+
+def _matches(q, row):
+    """Evaluate a Q of simple comparisons against a dict."""
+    results = []
+    for child in q.children:
+        if isinstance(child, Q):
+            results.append(_matches(child, row))
+        else:
+            lookup, value = child
+            name, _, op = lookup.partition("__")
+            results.append(_LOOKUPS[op or "exact"](row[name], value))
+    result = all(results) if q.connector == Q.AND else any(results)
+    return not result if q.negated else result
+
+
+def _sorted(rows, ordering):
+    rows = list(rows)
+    for name in reversed(ordering):
+        rows.sort(key=operator.itemgetter(name.lstrip("-")), reverse=name.startswith("-"))
+    return rows
@@ -1,10 +1,54 @@
 __author__ = "Megha Shinde"
 __date__ = "16-02-2026"
 __lastupdatedby__ = "Megha Shinde"
-__lastupdateddate__ = "17-02-2026"
+__lastupdateddate__ = "18-10-2026"
 
+from django.core.cache import cache
 from rest_framework.throttling import SimpleRateThrottle
 
+# Token bucket holding up to ARGV[1] tokens, refilled at ARGV[2] tokens per
+# second. Refill, take and expiry happen in one atomic call, timed by the
+# Redis clock so every worker agrees. Returns {allowed, seconds_to_wait}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / refill_rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000))
+return {allowed, tostring(wait)}
+"""
+
+_token_bucket = None
+
+
+def _token_bucket_script():
+    """The registered script, or None when the cache is not django-redis."""
+    global _token_bucket
+    if _token_bucket is None:
+        try:
+            from django_redis import get_redis_connection
+            _token_bucket = get_redis_connection("default").register_script(TOKEN_BUCKET_SCRIPT)
+        except (ImportError, NotImplementedError):
+            _token_bucket = False
+    return _token_bucket or None
+
 
 class RoleBasedUserThrottle(SimpleRateThrottle):
     scope = "role_based"
@@ -26,4 +70,17 @@ class RoleBasedUserThrottle(SimpleRateThrottle):
 
         self.num_requests, self.duration = self.parse_rate(self.rate)
 
-        return super().allow_request(request, view)
+        script = _token_bucket_script()
+        if script is None:
+            return super().allow_request(request, view)
+
+        # Own key: the SimpleRateThrottle history under get_cache_key() is a list
+        key = cache.make_key(f"{self.get_cache_key(request, view)}:bucket")
+        allowed, wait = script(keys=[key], args=[self.num_requests, self.num_requests / self.duration])
+        self._wait = float(wait)
+        return bool(allowed)
+
+    def wait(self):
+        if _token_bucket_script() is None:
+            return super().wait()
+        return self._wait
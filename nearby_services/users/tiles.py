@@ -0,0 +1,138 @@
+__author__ = "Megha Shinde"
+__date__ = "18-10-2026"
+__lastupdatedby__ = "Megha Shinde"
+__lastupdateddate__ = "18-10-2026"
+
+# Map tiles and tile-aligned clusters rendered in PostGIS. Both are cached by
+# the views, so they read from the primary (see db_router).
+
+import json
+
+
+from . import geo
+from .db_router import fill_connection
+from .models import Service
+
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_LAYER = "services"
+
+# Half the width of the Web Mercator world, in metres
+MERCATOR_EXTENT = 20037508.342789244
+
+
+def valid_tile(z, x, y, max_zoom):
+    return 0 <= z <= max_zoom and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def tiles_for_bbox(west, south, east, north, zoom):
+    """Every (x, y) tile at `zoom` intersecting the bounding box."""
+    x_min, y_min = geo.tile_index(north, west, zoom)
+    x_max, y_max = geo.tile_index(south, east, zoom)
+    return [
+        (x, y)
+        for x in range(x_min, x_max + 1)
+        for y in range(y_min, y_max + 1)
+    ]
+
+
+def _in_tile(location, n, x, y):
+    """
+    SQL condition: `location` lies in tile x/y of an n x n grid, by the same
+    half-open rule as geo.tile_index. The envelopes themselves are closed, so
+    a point on a tile edge would otherwise render in (and be cached under)
+    every tile sharing that edge, while a write only invalidates one of them.
+    """
+    lat = f"LEAST(GREATEST(ST_Y({location}), -{geo.MAX_MERCATOR_LAT}), {geo.MAX_MERCATOR_LAT})"
+    return f"""
+        LEAST(GREATEST(floor((ST_X({location}) + 180.0) / 360.0 * {n})::int, 0), {n} - 1) = {x}
+        AND LEAST(GREATEST(floor((1.0 - asinh(tan(radians({lat}))) / pi()) / 2.0 * {n})::int, 0), {n} - 1) = {y}
+    """
+
+
+def render_mvt(z, x, y, category=""):
+    """Mapbox Vector Tile bytes for the services inside tile z/x/y."""
+    connection = fill_connection()
+    table = connection.ops.quote_name(Service._meta.db_table)
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%s, %s, %s) AS geom, %s::int AS n, %s::int AS x, %s::int AS y
+        ),
+        features AS (
+            SELECT ST_AsMVTGeom(ST_Transform(s.location, 3857), bounds.geom) AS geom,
+                   s.id, s.name, s.category, s.rating
+            FROM {table} AS s, bounds
+            WHERE s.location && ST_Transform(bounds.geom, 4326)
+              AND {_in_tile("s.location", "bounds.n", "bounds.x", "bounds.y")}
+              AND (%s = '' OR s.category = %s)
+        )
+        SELECT ST_AsMVT(features.*, %s) FROM features
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, 1 << z, x, y, category, category, MVT_LAYER])
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile is not None else b""
+
+
+def cluster_tiles(z, tiles, category="", grid_per_tile=8):
+    """
+    Grid clusters for each (x, y) tile at zoom `z`, computed in one query.
+
+    Points are snapped to a Web Mercator grid of `grid_per_tile` x
+    `grid_per_tile` cells per tile, with the grid aligned to tile edges so a
+    cluster never straddles two tiles. Returns {(x, y): [cluster, ...]}.
+    """
+    clusters = {tile: [] for tile in tiles}
+    if not tiles:
+        return clusters
+
+    cell_size = 2 * MERCATOR_EXTENT / (1 << z) / grid_per_tile
+    # ST_SnapToGrid rounds to the nearest grid point; shifting the origin by
+    # half a cell turns that into cells whose edges sit on tile boundaries
+    origin = -MERCATOR_EXTENT + cell_size / 2
+
+    connection = fill_connection()
+    table = connection.ops.quote_name(Service._meta.db_table)
+    sql = f"""
+        WITH tiles AS (
+            SELECT t.x, t.y, ST_Transform(ST_TileEnvelope(%s, t.x, t.y), 4326) AS envelope, %s::int AS n
+            FROM unnest(%s::int[], %s::int[]) AS t(x, y)
+        ),
+        points AS (
+            SELECT tiles.x, tiles.y, s.category,
+                   ST_SnapToGrid(ST_Transform(s.location, 3857), %s, %s, %s, %s) AS cell,
+                   ST_X(s.location) AS lng, ST_Y(s.location) AS lat
+            FROM tiles
+            JOIN {table} AS s
+              ON s.location && tiles.envelope
+             AND {_in_tile("s.location", "tiles.n", "tiles.x", "tiles.y")}
+            WHERE %s = '' OR s.category = %s
+        ),
+        per_category AS (
+            SELECT x, y, ST_X(cell) AS cell_x, ST_Y(cell) AS cell_y, category,
+                   COUNT(*) AS n, AVG(lng) AS lng, AVG(lat) AS lat
+            FROM points
+            GROUP BY x, y, cell_x, cell_y, category
+        )
+        SELECT x, y, SUM(n)::int, SUM(lat * n) / SUM(n), SUM(lng * n) / SUM(n),
+               jsonb_object_agg(category, n)
+        FROM per_category
+        GROUP BY x, y, cell_x, cell_y
+    """
+    params = [
+        z, 1 << z, [x for x, _ in tiles], [y for _, y in tiles],
+        origin, origin, cell_size, cell_size,
+        category, category,
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for x, y, count, lat, lng, categories in cursor.fetchall():
+            clusters[(x, y)].append({
+                "count": count,
+                "lat": lat,
+                "lng": lng,
+                # Django reads jsonb as text and leaves decoding to JSONField
+                "categories": json.loads(categories) if isinstance(categories, str) else categories,
+            })
+    return clusters
@@ -3,15 +3,21 @@ __date__ = "16-02-2026"
 __lastupdatedby__ = "Megha Shinde"
 __lastupdateddate__ = "18-02-2026"
 
+from django.conf import settings
 from django.urls import path
 from .views import (
     RegisterView,
     ServiceCreateView,
     ServiceListView,
+    ServiceExportView,
+    ServiceImportView,
     ServiceDetailView,
     ServiceUpdateView,
     ServiceDeleteView,
     NearbyServiceView,
+    NearbyBatchView,
+    ServiceTileView,
+    ServiceClusterView,
     UpdateUserRoleView,
     AdminCreateUserView,
     ToggleUserStatusView,
@@ -19,10 +25,20 @@ from .views import (
     ActivityLogListView
 )
 
+if settings.ASYNC_READ_VIEWS:
+    # Under ASGI the read endpoints are served by their async versions
+    from .async_views import (
+        AsyncNearbyServiceView as NearbyServiceView,
+        AsyncServiceDetailView as ServiceDetailView,
+        AsyncServiceListView as ServiceListView,
+    )
+
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
 
     path('services/', ServiceListView.as_view(), name='service-list'),
+    path('services/export/', ServiceExportView.as_view(), name='service-export'),
+    path('services/import/', ServiceImportView.as_view(), name='service-import'),
     path('services/create/', ServiceCreateView.as_view(), name='service-create'),
     path('services/<int:pk>/', ServiceDetailView.as_view(), name='service-detail'),
     path('services/<int:pk>/update/', ServiceUpdateView.as_view(), name='service-update'),
@@ -32,5 +48,8 @@ urlpatterns = [
     path("users/<int:pk>/disable/", ToggleUserStatusView.as_view(), name="disable-user"),
     path("users/", UserListView.as_view(), name="user-list"),
     path('nearby/', NearbyServiceView.as_view(), name='nearby-services'),
+    path('nearby/batch/', NearbyBatchView.as_view(), name='nearby-batch'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', ServiceTileView.as_view(), name='service-tile'),
+    path('clusters/', ServiceClusterView.as_view(), name='service-clusters'),
     path('activity-logs/', ActivityLogListView.as_view(), name='activity-logs'),
 ]
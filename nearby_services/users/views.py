@@ -4,19 +4,41 @@ __lastupdatedby__ = "Megha Shinde"
 __lastupdateddate__ = "18-02-2026"
 
 
+import io
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
 from django.core.cache import cache
-from django.contrib.gis.geos import Point
-from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.measure import D
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.exceptions import PermissionDenied
-from .serializers import UserRegisterSerializer, ServiceSerializer, UserListSerializer
-from .models import Service, User, ActivityLog
+from .serializers import UserRegisterSerializer, ServiceSerializer, UserListSerializer, service_rows
+from .models import Service, User
 from rest_framework import status
 from .permissions import IsStaffOrAdmin, IsAdminRole
+from .authentication import invalidate_cached_user
+from .audit import ACTIVITY_LOG_ORDERING, activity_log_queryset, record_activity
+from .pagination import keyset_page, parse_page_size
+from .ingest import IMPORT_FORMATS, IngestError, import_services, parse_records
+from .export import CONTENT_TYPES, EXPORT_FORMATS, export_queryset, parse_timestamp, stream_export
+from .search import (
+    batch_nearby, candidate_queryset, direct_queryset, direct_results, filter_metadata,
+    parse_metadata_filter, parse_nearby_query, uses_cell_cache, uses_memory_index
+)
+from .caching import (
+    NearbyCell, cell_version, invalidate_locations, is_oversized, nearby_etag, pack_candidates,
+    select_candidates, service_detail_key, service_point, tile_cache_key, tile_cache_keys
+)
+from .spatial_index import get_service_index
+from .cache_fill import cached_bytes
+from .db_router import CACHE_FILL_DB
+from .rendering import (
+    detail_entry, envelope_bytes, etag_json_response, etag_matches, gzip_json, gzip_json_response,
+    json_response, not_modified, render_json, service_detail_payload, service_etag,
+    split_detail_entry, with_validators
+)
+from .tiles import MVT_CONTENT_TYPE, cluster_tiles, render_mvt, tiles_for_bbox, valid_tile
 from django.conf import settings
 
 
@@ -100,11 +122,12 @@ class UpdateUserRoleView(APIView):
 
             user.role = role
             user.save()
-            ActivityLog.objects.create(
+            invalidate_cached_user(user.id)
+            record_activity(
                     performed_by=request.user,
                     target_user=user,
-                    action="create_user",
-                    details={"email": user.email}
+                    action="update_role",
+                    details={"email": user.email, "role": user.role}
                 )
 
 
@@ -149,7 +172,7 @@ class AdminCreateUserView(APIView):
 
             if serializer.is_valid():
                 user = serializer.save()
-                ActivityLog.objects.create(
+                record_activity(
                     performed_by=request.user,
                     target_user=user,
                     action="create_user",
@@ -220,8 +243,9 @@ class ToggleUserStatusView(APIView):
             # Update user status
             user.is_active = bool(is_active)
             user.save()
+            invalidate_cached_user(user.id)
             print("11111111111111",user.is_active)
-            ActivityLog.objects.create(
+            record_activity(
                     performed_by=request.user,
                     target_user=user,
                     action="toggle_status",
@@ -319,9 +343,10 @@ class ServiceCreateView(APIView):
             if serializer.is_valid():
                 service = serializer.save(created_by=request.user)
 
-                # Clear related cache
-                cache.delete_pattern("nearby:*")
-                cache.delete_pattern("service_detail:*")
+                # Clear cached nearby results around the new service, and any
+                # cached "not found" for its id
+                invalidate_locations([service_point(service)])
+                cache.delete(service_detail_key(service.id))
 
                 data = {
                     "status": "success",
@@ -351,6 +376,55 @@ class ServiceCreateView(APIView):
 
 
 
+# -----------------------------
+# 📥 BULK IMPORT SERVICES (Admin Only)
+# -----------------------------
+class ServiceImportView(APIView):
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+    def post(self, request):
+        try:
+            upload = request.FILES.get("file")
+            # `format` is reserved by DRF content negotiation
+            import_format = request.GET.get("input", "csv")
+
+            if not upload or import_format not in IMPORT_FORMATS:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": f"A 'file' upload and input ({', '.join(IMPORT_FORMATS)}) are required",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+
+            try:
+                created = import_services(parse_records(stream, import_format), request.user)
+            except IngestError as e:
+                return Response({
+                    "status": "error",
+                    "error_code": 100,
+                    "message": e.errors,
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({
+                "status": "success",
+                "error_code": 0,
+                "message": "Services imported successfully",
+                "data": {"created": created}
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
 # -----------------------------
 # 📋 LIST ALL SERVICES
 # -----------------------------
@@ -359,16 +433,34 @@ class ServiceListView(APIView):
 
     def get(self, request):
         try:
-            services = Service.objects.all()
-            serializer = ServiceSerializer(services, many=True)
+            try:
+                page_size = parse_page_size(
+                    request.GET.get("page_size"),
+                    settings.SERVICE_LIST_PAGE_SIZE,
+                    settings.SERVICE_LIST_MAX_PAGE_SIZE
+                )
+                metadata = parse_metadata_filter(request.GET.get("metadata"))
+                services = filter_metadata(Service.objects.all(), metadata)
+                services, next_cursor = keyset_page(
+                    service_rows(services), ["id"], request.GET.get("cursor"), page_size
+                )
+            except ValueError as e:
+                data = {
+                    "status": "error",
+                    "error_code": 102,
+                    "message": str(e),
+                    "data": ""
+                }
+                return Response(data, status=status.HTTP_400_BAD_REQUEST)
 
             data = {
                 "status": "success",
                 "error_code": 0,
                 "message": "Service list fetched successfully",
-                "data": serializer.data
+                "data": services,
+                "next_cursor": next_cursor
             }
-            return Response(data)
+            return etag_json_response(request, render_json(data))
 
         except Exception as e:
             data = {
@@ -381,6 +473,56 @@ class ServiceListView(APIView):
 
 
 
+# -----------------------------
+# 📦 EXPORT ALL SERVICES (Streaming)
+# -----------------------------
+class ServiceExportView(APIView):
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+    def get(self, request):
+        try:
+            # `format` is reserved by DRF content negotiation
+            export_format = request.GET.get("output", "ndjson")
+
+            if export_format not in EXPORT_FORMATS:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": f"output must be one of {', '.join(EXPORT_FORMATS)}",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                services = export_queryset(
+                    category=request.GET.get("category"),
+                    updated_after=parse_timestamp(request.GET.get("updated_after"), "updated_after"),
+                    updated_before=parse_timestamp(request.GET.get("updated_before"), "updated_before")
+                )
+            except ValueError as e:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": str(e),
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            response = StreamingHttpResponse(
+                stream_export(services, export_format),
+                content_type=CONTENT_TYPES[export_format]
+            )
+            response["Content-Disposition"] = f'attachment; filename="services.{export_format}"'
+            return response
+
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
 # -----------------------------
 # 📄 SERVICE DETAIL (Cached)
 # -----------------------------
@@ -397,37 +539,30 @@ class ServiceDetailView(APIView):
                     "data": ""
                 })
 
-            cache_key = f"service_detail:{pk}"
-            cached_data = cache.get(cache_key)
+            # The cache holds the ETag and the gzip-compressed response body,
+            # served as is on a hit. "Not found" is cached too, so unknown ids
+            # do not reach the database.
+            fetched = []
 
-            if cached_data:
-                return Response({
-                    "status": "success",
-                    "error_code": 0,
-                    "message": "Service fetched successfully (cached)",
-                    "data": cached_data
-                })
+            def fill():
+                service = service_rows(Service.objects.using(CACHE_FILL_DB).filter(id=pk), "updated_at").first()
+                etag = service_etag(service["id"], service.pop("updated_at")) if service else None
+                fetched.append((service, etag))
+                body = gzip_json(service_detail_payload(service, cached=True))
+                return detail_entry(etag, body), service is None
 
-            service = Service.objects.filter(id=pk).first()
+            entry, cached = cached_bytes(service_detail_key(pk), fill, settings.CACHE_TTL)
 
-            if not service:
-                return Response({
-                    "status": "error",
-                    "error_code": 100,
-                    "message": "Service not found",
-                    "data": ""
-                })
+            if cached:
+                etag, body = split_detail_entry(entry)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+                return gzip_json_response(request, body, etag)
 
-            serializer = ServiceSerializer(service)
-
-            cache.set(cache_key, serializer.data, timeout=settings.CACHE_TTL)
-
-            return Response({
-                "status": "success",
-                "error_code": 0,
-                "message": "Service fetched successfully",
-                "data": serializer.data
-            })
+            service, etag = fetched[0]
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return with_validators(Response(service_detail_payload(service, cached=False)), etag)
 
         except Exception as e:
             return Response({
@@ -455,13 +590,14 @@ class ServiceUpdateView(APIView):
                     "data": ""
                 })
 
+            old_point = service_point(service)
             serializer = ServiceSerializer(service, data=request.data)
 
             if serializer.is_valid():
-                serializer.save()
+                service = serializer.save()
 
-                cache.delete(f"service_detail:{pk}")
-                cache.delete_pattern("nearby:*")
+                cache.delete(service_detail_key(pk))
+                invalidate_locations([old_point, service_point(service)])
 
                 return Response({
                     "status": "success",
@@ -506,10 +642,11 @@ class ServiceDeleteView(APIView):
                     "data": ""
                 })
 
+            old_point = service_point(service)
             service.delete()
 
-            cache.delete(f"service_detail:{pk}")
-            cache.delete_pattern("nearby:*")
+            cache.delete(service_detail_key(pk))
+            invalidate_locations([old_point])
 
             return Response({
                 "status": "success",
@@ -536,71 +673,70 @@ class NearbyServiceView(APIView):
 
     def get(self, request):
         try:
-            lat = request.GET.get("latitude")
-            lng = request.GET.get("longitude")
-            radius = request.GET.get("radius", 5)
-            category = request.GET.get("category", "")
-
-            # Validate required params
-            if not lat or not lng:
-                data = {
-                    "status": "error",
-                    "error_code": 102,
-                    "message": "latitude and longitude are required",
-                    "data": ""
-                }
-                return Response(data, status=status.HTTP_400_BAD_REQUEST)
-
             try:
-                lat = float(lat)
-                lng = float(lng)
-                radius = float(radius)
-            except ValueError:
+                query = parse_nearby_query(request.GET)
+            except ValueError as e:
                 data = {
                     "status": "error",
                     "error_code": 102,
-                    "message": "Invalid latitude, longitude or radius",
+                    "message": str(e),
                     "data": ""
                 }
                 return Response(data, status=status.HTTP_400_BAD_REQUEST)
 
-            cache_key = f"nearby:{lat}:{lng}:{radius}:{category}"
+            lat, lng = query["lat"], query["lng"]
+            radius, limit = query["radius"], query["limit"]
+            category = query["category"]
 
-            cached_data = cache.get(cache_key)
-            if cached_data:
+            if uses_memory_index(query):
+                # Served from this worker's in-process spatial index
                 data = {
                     "status": "success",
                     "error_code": 0,
-                    "message": "Nearby services fetched successfully (cached)",
-                    "data": cached_data
+                    "message": "Nearby services fetched successfully",
+                    "data": get_service_index().search(
+                        lat, lng, radius, category, limit, query["min_rating"], query["sort"]
+                    )
                 }
-                return Response(data)
+                return etag_json_response(request, render_json(data))
 
-            user_location = Point(lng, lat, srid=4326)
+            cell = NearbyCell.for_search(lat, lng, radius) if uses_cell_cache(query) else None
+            etag = None
 
-            services = Service.objects.annotate(
-                distance=Distance("location", user_location)
-            ).filter(
-                location__distance_lte=(user_location, D(km=radius))
-            )
+            if cell is not None:
+                # Cached path: candidates are shared by every caller in the cell
+                cache_key = cell.cache_key(category, cell_version(cell), query["q"], query["metadata"])
 
-            if category:
-                services = services.filter(category=category)
+                # The cell version changes with any write in reach, so a
+                # revalidation needs no candidates at all
+                etag = nearby_etag(cache_key, query)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
 
-            services = services.order_by("distance")
+                def fill():
+                    rows = list(candidate_queryset(cell, query))
+                    return pack_candidates(rows), not rows
 
-            serializer = ServiceSerializer(services, many=True)
+                candidates, cached = cached_bytes(cache_key, fill, settings.CACHE_TTL)
 
-            cache.set(cache_key, serializer.data, timeout=settings.CACHE_TTL)
+                if not is_oversized(candidates):
+                    # Rows are cached pre-rendered; the body is assembled as bytes
+                    return with_validators(json_response(envelope_bytes(
+                        "Nearby services fetched successfully (cached)" if cached
+                        else "Nearby services fetched successfully",
+                        select_candidates(candidates, lat, lng, radius, limit, query["min_rating"])
+                    )), etag)
+                # Too many candidates to cache: answered by PostGIS below,
+                # still validated by the cell's ETag
 
             data = {
                 "status": "success",
                 "error_code": 0,
                 "message": "Nearby services fetched successfully",
-                "data": serializer.data
+                "data": direct_results(list(direct_queryset(query)), query)
             }
 
-            return Response(data)
+            return etag_json_response(request, render_json(data), etag)
 
         except Exception as e:
             data = {
@@ -612,13 +748,211 @@ class NearbyServiceView(APIView):
             return Response(data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# -----------------------------
+# 📍 BATCH NEARBY SEARCH (One SQL Statement)
+# -----------------------------
+class NearbyBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+    # POST only to carry the query list; it never writes
+    replica_reads = True
+
+    def post(self, request):
+        try:
+            raw_queries = request.data.get("queries") if isinstance(request.data, dict) else None
+
+            if not isinstance(raw_queries, list) or not raw_queries:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": "queries must be a non-empty list",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            if len(raw_queries) > settings.NEARBY_BATCH_MAX_QUERIES:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": f"At most {settings.NEARBY_BATCH_MAX_QUERIES} queries per batch",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            queries, errors = [], {}
+            for index, raw_query in enumerate(raw_queries):
+                try:
+                    if not isinstance(raw_query, dict):
+                        raise ValueError("Each query must be an object")
+                    query = parse_nearby_query(raw_query)
+                    if query["sort"] != "distance":
+                        raise ValueError("Batch queries are always sorted by distance")
+                    if query["q"]:
+                        raise ValueError("q is not supported in batch queries")
+                    queries.append(query)
+                except ValueError as e:
+                    errors[str(index)] = str(e)
+
+            if errors:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": errors,
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            results = batch_nearby(queries)
+
+            return Response({
+                "status": "success",
+                "error_code": 0,
+                "message": "Nearby services fetched successfully",
+                "data": {str(index): rows for index, rows in enumerate(results)}
+            })
+
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# -----------------------------
+# 🗺 VECTOR TILES (Cached MVT)
+# -----------------------------
+class ServiceTileView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, z, x, y):
+        try:
+            if not valid_tile(z, x, y, settings.TILE_MAX_ZOOM):
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": f"Invalid tile, zoom must be between 0 and {settings.TILE_MAX_ZOOM}",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            category = request.GET.get("category", "")
+            cache_key = tile_cache_key("tile", z, x, y, category)
+
+            tile = cache.get(cache_key)
+            if tile is None:
+                tile = render_mvt(z, x, y, category)
+                cache.set(cache_key, tile, timeout=settings.TILE_CACHE_TTL)
+
+            return HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# -----------------------------
+# 🗺 CLUSTERS (Zoomed-out Map Views)
+# -----------------------------
+class ServiceClusterView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            category = request.GET.get("category", "")
+
+            try:
+                zoom = int(request.GET.get("zoom", ""))
+                west, south, east, north = (float(v) for v in request.GET.get("bbox", "").split(","))
+            except ValueError:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": "zoom and bbox (west,south,east,north) are required",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            if not 0 <= zoom <= settings.TILE_MAX_ZOOM or west >= east or south >= north:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": "Invalid zoom or bbox",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            tiles = tiles_for_bbox(west, south, east, north, zoom)
+
+            if len(tiles) > settings.CLUSTER_MAX_TILES:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": "bbox is too large for this zoom level",
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Clusters are cached per tile; only the missing tiles are queried
+            cache_keys = tile_cache_keys("clusters", [(zoom, x, y) for x, y in tiles], category)
+            cached = cache.get_many(list(cache_keys.values()))
+
+            clusters = []
+            missing = []
+            for x, y in tiles:
+                tile_clusters = cached.get(cache_keys[(zoom, x, y)])
+                if tile_clusters is None:
+                    missing.append((x, y))
+                else:
+                    clusters.extend(tile_clusters)
+
+            if missing:
+                computed = cluster_tiles(zoom, missing, category, settings.CLUSTER_GRID_PER_TILE)
+                cache.set_many(
+                    {cache_keys[(zoom, x, y)]: tile_clusters for (x, y), tile_clusters in computed.items()},
+                    timeout=settings.TILE_CACHE_TTL
+                )
+                for tile_clusters in computed.values():
+                    clusters.extend(tile_clusters)
+
+            return Response({
+                "status": "success",
+                "error_code": 0,
+                "message": "Service clusters fetched successfully",
+                "data": clusters
+            })
+
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error_code": 101,
+                "message": f"Error: {str(e)}",
+                "data": ""
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class ActivityLogListView(APIView):
     permission_classes = [IsAuthenticated, IsAdminRole]
 
     def get(self, request):
         try:
-            logs = ActivityLog.objects.select_related("performed_by", "target_user").all()
-            
+            try:
+                page_size = parse_page_size(
+                    request.GET.get("page_size"),
+                    settings.ACTIVITY_LOG_PAGE_SIZE,
+                    settings.ACTIVITY_LOG_MAX_PAGE_SIZE
+                )
+                logs, next_cursor = keyset_page(
+                    activity_log_queryset(request.GET),
+                    ACTIVITY_LOG_ORDERING,
+                    request.GET.get("cursor"),
+                    page_size
+                )
+            except ValueError as e:
+                return Response({
+                    "status": "error",
+                    "error_code": 102,
+                    "message": str(e),
+                    "data": ""
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             data = []
             for log in logs:
                 data.append({
@@ -642,7 +976,8 @@ class ActivityLogListView(APIView):
                 "status": "success",
                 "error_code": 0,
                 "message": "Activity logs fetched successfully",
-                "data": data
+                "data": data,
+                "next_cursor": next_cursor
             }, status=status.HTTP_200_OK)
 
         except Exception as e: